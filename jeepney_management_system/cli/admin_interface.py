@@ -1,9 +1,204 @@
+import os
+from datetime import datetime
+from database.queries import JeepneyQueries, TransactionQueries, AnomalyQueries
+from utils import metrics
+from utils.constants import JEEPNEY_STATUSES
+
+PAYMENT_STATUSES = ("exact", "overpaid", "underpaid")
+
+
 class AdminInterface:
-    # Admin interface placeholder
-    
-    def __init__(self):
-        pass
-    
+    # CLI for depot administrators
+
+    def __init__(self, profiler: metrics.SamplingProfiler = None):
+        self.jeepney_queries = JeepneyQueries()
+        self.transaction_queries = TransactionQueries()
+        self.anomaly_queries = AnomalyQueries()
+        self.profiler = profiler
+
     def run(self):
-        print("Admin interface not implemented yet!")
-        print("Coming soon in Phase 2...")
+        # Main admin interface loop
+        print("Jeepney Admin System")
+        print("=" * 30)
+
+        while True:
+            self.show_main_menu()
+            choice = input("\nEnter your choice: ").strip()
+
+            if choice == "1":
+                self.list_units()
+            elif choice == "2":
+                self.view_unit_transactions()
+            elif choice == "3":
+                self.search_transactions()
+            elif choice == "4":
+                self.view_anomaly_alerts()
+            elif choice == "5":
+                self.view_metrics()
+            elif choice == "6":
+                self.toggle_metrics()
+            elif choice == "7":
+                self.view_profile()
+            elif choice == "8":
+                print("Goodbye!")
+                break
+            else:
+                print("Invalid choice. Please try again.")
+
+    def show_main_menu(self):
+        # Display main menu options
+        print("\n" + "=" * 40)
+        print("ADMIN MENU")
+        print("=" * 40)
+        print("1. 🚌 List Units")
+        print("2. 📒 Unit Transactions")
+        print("3. 🔎 Search Transactions")
+        print("4. ⚠️  Anomaly Alerts")
+        print("5. 📈 View Metrics")
+        print(f"6. ⏱️  {'Disable' if metrics.is_enabled() else 'Enable'} Instrumentation (this process)")
+        print("7. 🔥 Profiler Hot Stacks")
+        print("8. 🚪 Exit")
+
+    def page_through(self, pages, print_header, print_row) -> int:
+        # Print pages one at a time, fetching the next only when asked
+        shown = 0
+        for page in pages:
+            if shown == 0:
+                print_header()
+            for row in page:
+                print_row(row)
+            shown += len(page)
+            answer = input(f"-- {shown} shown. Enter for more, q to stop: ").strip().lower()
+            if answer == "q":
+                break
+        if shown == 0:
+            print("No records found.")
+        return shown
+
+    def list_units(self):
+        # Browse the fleet, optionally narrowed by route or status
+        print("\nFleet Units")
+        route_id = input("Route (blank for all): ").strip().upper() or None
+        status = input(f"Status ({'/'.join(JEEPNEY_STATUSES)}, blank for all): ").strip().lower() or None
+        if status and status not in JEEPNEY_STATUSES:
+            print("Invalid status.")
+            return
+
+        def header():
+            print(f"\n{'Jeepney ID':<26} {'Plate':<10} {'Route':<6} {'Status':<12} {'Driver':<20}")
+            print("-" * 78)
+
+        def row(unit):
+            print(f"{unit['jeepney_id']:<26} {unit['plate_number']:<10} {unit['route_id']:<6} "
+                  f"{unit['status']:<12} {unit['driver_name'][:20]:<20}")
+
+        pages = self.jeepney_queries.iter_jeepney_pages(route_id=route_id, status=status)
+        self.page_through(pages, header, row)
+
+    def view_unit_transactions(self):
+        # Drill into a single unit's transactions
+        jeepney_id = input("\nJeepney ID: ").strip().upper()
+        unit = self.jeepney_queries.get_jeepney(jeepney_id)
+        if unit is None:
+            print("Unit not found.")
+            return
+
+        print(f"\n🚌 {unit['plate_number']} | 📍 Route {unit['route_id']} | 👨‍✈️ {unit['driver_name']}")
+        pages = self.transaction_queries.iter_transaction_pages(jeepney_id=jeepney_id)
+        self.page_through(pages, self.print_transaction_header, self.print_transaction_row)
+
+    def search_transactions(self):
+        # Search transactions across the fleet
+        print("\nSearch Transactions (leave blank to skip a filter)")
+        start_date = self.get_optional_date("From date (YYYY-MM-DD): ")
+        end_date = self.get_optional_date("To date (YYYY-MM-DD): ")
+        plate_number = input("Plate number: ").strip().upper() or None
+        route_id = input("Route: ").strip().upper() or None
+        payment_status = input(f"Payment status ({'/'.join(PAYMENT_STATUSES)}): ").strip().lower() or None
+        if payment_status and payment_status not in PAYMENT_STATUSES:
+            print("Invalid payment status.")
+            return
+
+        pages = self.transaction_queries.iter_transaction_pages(
+            start_date=start_date,
+            end_date=end_date,
+            plate_number=plate_number,
+            route_id=route_id,
+            payment_status=payment_status
+        )
+        self.page_through(pages, self.print_transaction_header, self.print_transaction_row)
+
+    def view_anomaly_alerts(self):
+        # Browse alerts raised by the anomaly detector, newest first
+        kind = input("\nAlert kind (unusual_change/discount_ratio/underpayment/revenue_dip, blank for all): ").strip().lower() or None
+
+        def header():
+            print(f"\n{'Detected':<20} {'Kind':<15} {'Entity':<28} {'Message'}")
+            print("-" * 100)
+
+        def row(alert):
+            entity = f"{alert['entity_type']} {alert['entity_id']}"
+            print(f"{alert['detected_at']:<20} {alert['kind']:<15} {entity[:28]:<28} {alert['message']}")
+
+        self.page_through(self.anomaly_queries.iter_alert_pages(kind=kind), header, row)
+
+    def get_optional_date(self, prompt: str):
+        # Ask for a date until it is valid or left blank
+        while True:
+            value = input(prompt).strip()
+            if not value:
+                return None
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+                return value
+            except ValueError:
+                print("Please use the YYYY-MM-DD format.")
+
+    def print_transaction_header(self):
+        print(f"\n{'Time':<20} {'ID':<8} {'Plate':<10} {'Route':<6} {'Type':<8} "
+              f"{'Fare':<7} {'Paid':<7} {'Change':<7} {'Status':<9}")
+        print("-" * 90)
+
+    def print_transaction_row(self, t):
+        print(f"{t['transaction_time']:<20} {t['transaction_id'][:8]:<8} "
+              f"{t['plate_number']:<10} {t['route_id']:<6} {t['passenger_type'][:8]:<8} "
+              f"₱{t['required_fare']:<6.2f} ₱{t['amount_paid']:<6.2f} "
+              f"₱{t['change_given']:<6.2f} {t['payment_status']:<9}")
+
+    def view_metrics(self):
+        # Print this process's metrics merged with those exported by driver and monitor processes
+        snapshots = metrics.read_snapshots()
+        print(f"\nMetrics from this admin process (pid {os.getpid()}) and {len(snapshots)} exported process(es):")
+        for data in snapshots:
+            written = datetime.fromtimestamp(data["written_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"   {data['role']} pid {data['pid']} (exported {written})")
+        if not snapshots:
+            print("   Start driver or monitor mode with --metrics to export their metrics.")
+        if not metrics.is_enabled():
+            print("Instrumentation is disabled in this admin process.")
+        print()
+        print(metrics.fleet_registry(snapshots).render_text())
+
+    def toggle_metrics(self):
+        # Turn instrumentation on or off at runtime (this process only)
+        if metrics.is_enabled():
+            metrics.disable()
+            print("Instrumentation disabled in this admin process.")
+        else:
+            metrics.enable()
+            print("Instrumentation enabled in this admin process.")
+
+    def view_profile(self):
+        # Show the hottest call stacks of this process and of exporting processes
+        if self.profiler is not None:
+            print(f"\n🔥 This admin process (pid {os.getpid()})")
+            print(self.profiler.format_report())
+
+        profiles = [data for data in metrics.read_snapshots() if data["profile"]]
+        for data in profiles:
+            written = datetime.fromtimestamp(data["written_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"\n🔥 {data['role']} process (pid {data['pid']}, exported {written})")
+            print(data["profile"])
+
+        if self.profiler is None and not profiles:
+            print("No profiles available. Start any mode with --profile to profile that process.")
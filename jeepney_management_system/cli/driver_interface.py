@@ -1,23 +1,31 @@
 import uuid
 from datetime import datetime
+from config import Config
 from services.fare_calculator import FareCalculator
 from services.analytics import AnalyticsService
-from database.queries import JeepneyQueries, TransactionQueries
+from services.seat_sensors import SeatOccupancyPipeline, SeatSensorFeed
+from database.queries import JeepneyQueries, TransactionQueries, ReconciliationQueries, SensorQueries
 from models.jeepney import Jeepney
 from models.passenger import Passenger
 from models.transaction import Transaction
 from utils.validators import InputValidator
+from utils.config_registry import get_registry
 
 class DriverInterface:
     # CLI for the Driver
     
-    def __init__(self):
+    def __init__(self, sensors: bool = False):
         self.fare_calculator = FareCalculator()
         self.analytics = AnalyticsService()
         self.jeepney_queries = JeepneyQueries()
         self.transaction_queries = TransactionQueries()
+        self.reconciliation_queries = ReconciliationQueries()
         self.validator = InputValidator()
+        self.registry = get_registry()
         self.current_jeepney = None
+        # Seat sensors stream into the pipeline from a background thread
+        self.sensor_pipeline = SeatOccupancyPipeline(SensorQueries()) if sensors else None
+        self.sensor_feed = None
     
     def run(self):
         # Main driver interface loop
@@ -26,6 +34,9 @@ class DriverInterface:
         
         # Initialize jeepney
         self.setup_jeepney()
+        if self.sensor_pipeline is not None:
+            self.sensor_feed = SeatSensorFeed(self.current_jeepney, self.sensor_pipeline)
+            self.sensor_feed.start()
         
         while True:
             self.show_main_menu()
@@ -42,10 +53,18 @@ class DriverInterface:
             elif choice == "5":
                 self.view_transaction_log()
             elif choice == "6":
+                self.end_shift()
+                break
+            elif choice == "7":
+                self.view_seat_sensors()
+            elif choice == "8":
                 print("Thank you for using the system!")
                 break
             else:
                 print("Invalid choice. Please try again.")
+        
+        if self.sensor_feed:
+            self.sensor_feed.stop()
     
     def show_main_menu(self):
         # Display main menu options
@@ -57,7 +76,9 @@ class DriverInterface:
         print("3. 📊 Current Status")
         print("4. 📈 Daily Summary")
         print("5. 📒 Transaction Log")
-        print("6. 🚪 Exit")
+        print("6. 💵 End Shift (Turn In Cash)")
+        print("7. 🪑 Seat Sensors")
+        print("8. 🚪 Exit")
         
         if self.current_jeepney:
             occupancy = self.current_jeepney.get_current_occupancy()
@@ -70,6 +91,9 @@ class DriverInterface:
         plate_number = input("Enter jeepney plate number: ").strip().upper()
         driver_name = input("Enter driver name: ").strip()
         route_id = input("Enter route (e.g., 01A, 02B): ").strip().upper()
+        routes = self.registry.current().routes
+        if routes and route_id not in routes:
+            print(f"⚠️ Route {route_id} is not in the route list")
         
         jeepney_id = f"JP_{plate_number}_{datetime.now().strftime('%Y%m%d')}"
         
@@ -79,6 +103,7 @@ class DriverInterface:
             driver_name=driver_name,
             route_id=route_id
         )
+        self.jeepney_queries.save_jeepney(self.current_jeepney)
         
         print(f"✅ Jeepney {plate_number} setup complete!")
         print(f"📍 Route: {route_id}")
@@ -145,11 +170,14 @@ class DriverInterface:
                 transaction.destination = destination
                 print(f"Change to give: ₱{payment_result['change']:.2f}")
             
-            # Add to jeepney
+            # Add to jeepney (a boarding ends the sensor segment at this stop)
+            if self.sensor_feed:
+                self.sensor_feed.record_stop()
             self.current_jeepney.add_passenger(passenger, transaction)
             
-            # Save to database (in real implementation)
-            # self.transaction_queries.save_transaction(transaction)
+            # Save to database
+            self.transaction_queries.save_transaction(transaction)
+            self.jeepney_queries.update_occupancy(self.current_jeepney)
             
             print(f"Passenger {passenger_id} added successfully!")
             print(f"Current occupancy: {self.current_jeepney.get_current_occupancy()}/{self.current_jeepney.capacity}")
@@ -159,7 +187,7 @@ class DriverInterface:
     
     def get_passenger_type(self) -> str:
         # Get and validate passenger type
-        valid_types = ["regular", "student", "senior", "pwd"]
+        valid_types = self.registry.current().passenger_types
         
         while True:
             print("\nPassenger Types:")
@@ -167,19 +195,19 @@ class DriverInterface:
                 print(f"{i}. {ptype.title()}")
             
             try:
-                choice = int(input("Select passenger type (1-4): "))
-                if 1 <= choice <= 4:
+                choice = int(input(f"Select passenger type (1-{len(valid_types)}): "))
+                if 1 <= choice <= len(valid_types):
                     return valid_types[choice - 1]
                 else:
-                    print("Invalid choice. Please select 1-4.")
+                    print(f"Invalid choice. Please select 1-{len(valid_types)}.")
             except ValueError:
                 print("Please enter a valid number.")
     
-    def get_payment_amount(self) -> float:
+    def get_payment_amount(self, prompt: str = "Amount paid: ₱") -> float:
         # Get and validate payment amount
         while True:
             try:
-                amount = float(input("Amount paid: ₱"))
+                amount = float(input(prompt))
                 if amount < 0:
                     print("Amount cannot be negative.")
                     continue
@@ -219,7 +247,10 @@ class DriverInterface:
                 passenger.alighting_time = datetime.now()
                 
                 # Remove passenger
+                if self.sensor_feed:
+                    self.sensor_feed.record_stop()
                 self.current_jeepney.remove_passenger(passenger.passenger_id)
+                self.jeepney_queries.update_occupancy(self.current_jeepney)
                 
                 print(f"✅ Passenger {passenger.passenger_id} has alighted!")
                 print(f"📊 Current occupancy: {self.current_jeepney.get_current_occupancy()}/{self.current_jeepney.capacity}")
@@ -293,14 +324,13 @@ class DriverInterface:
         print(f"📍 Route: {self.current_jeepney.route_id}")
         
         # Overall stats
-        total_revenue = sum(t.amount_paid for t in transactions)
-        total_passengers = len(transactions)
-        total_change = sum(t.change_given for t in transactions)
+        totals = self.current_jeepney.get_daily_totals()
+        total_passengers = totals["passengers"]
         
-        print(f"\n💰 Total Revenue: ₱{total_revenue:.2f}")
+        print(f"\n💰 Total Revenue: ₱{totals['revenue']:.2f}")
         print(f"👥 Total Passengers: {total_passengers}")
-        print(f"💵 Total Change Given: ₱{total_change:.2f}")
-        print(f"📊 Net Revenue: ₱{total_revenue - total_change:.2f}")
+        print(f"💵 Total Change Given: ₱{totals['change']:.2f}")
+        print(f"📊 Net Revenue: ₱{totals['net_revenue']:.2f}")
         
         # Busiest hours
         if hours:
@@ -316,9 +346,54 @@ class DriverInterface:
                 print(f"   {ptype.title()}: {count} ({percentage:.1f}%)")
         
         # Payment efficiency
-        exact_payments = sum(1 for t in transactions if t.payment_status == "exact")
-        efficiency = (exact_payments / total_passengers) * 100 if total_passengers > 0 else 0
-        print(f"\n💡 Payment Efficiency: {efficiency:.1f}% exact payments")
+        print(f"\n💡 Payment Efficiency: {totals['payment_efficiency']:.1f}% exact payments")
+    
+    def end_shift(self):
+        # Record the cash handed over alongside the day's totals and take the unit off duty
+        print("\nEnd Shift")
+        print("=" * 30)
+        
+        totals = self.current_jeepney.get_daily_totals()
+        print(f"📊 Net Revenue on record: ₱{totals['net_revenue']:.2f}")
+        
+        cash = self.get_payment_amount("Cash turned in: ₱")
+        self.reconciliation_queries.save_turnin(
+            self.current_jeepney.jeepney_id,
+            # Filed under the day the shift started, even if it ran past midnight
+            self.current_jeepney.created_at.strftime("%Y-%m-%d"),
+            cash,
+            totals
+        )
+        
+        difference = cash - totals["net_revenue"]
+        if abs(difference) <= Config.RECONCILE_TOLERANCE:
+            print("✅ Cash matches the day's net revenue.")
+        else:
+            print(f"⚠️ Cash differs from net revenue by ₱{difference:+.2f}")
+        
+        self.current_jeepney.status = "inactive"
+        self.jeepney_queries.save_jeepney(self.current_jeepney)
+        print("👋 Shift ended. Thank you for using the system!")
+    
+    def view_seat_sensors(self):
+        # Compare sensed seat occupancy with fare-based occupancy
+        print("\nSeat Sensors")
+        print("=" * 30)
+        
+        if self.sensor_feed is None:
+            print("Seat sensors are off. Start driver mode with --sensors to enable them.")
+            return
+        
+        jeepney_id = self.current_jeepney.jeepney_id
+        print(f"🪑 Sensed occupancy: {self.sensor_pipeline.get_sensed_occupancy(jeepney_id)}")
+        print(f"🎫 Fare-based occupancy: {self.current_jeepney.get_current_occupancy()}")
+        
+        summary = self.sensor_pipeline.get_unit_reconciliation(jeepney_id)
+        print(f"\nClosed segments: {summary['segments']}")
+        if summary["segments"]:
+            print(f"Average discrepancy: {summary['average_discrepancy']:+.2f} seats")
+            print(f"Largest discrepancy: {summary['max_discrepancy']:.2f} seats")
+            print(f"⚠️ Flagged segments: {summary['flagged_segments']}")
     
     def view_transaction_log(self):
         # Display transaction history
@@ -4,8 +4,15 @@ from datetime import datetime
 class Config:
     # Database
     DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///data/jeepney_database.db')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))  # PostgreSQL connections per process
+    DB_POOL_TIMEOUT = 30  # seconds to wait for a free pooled connection
+    DB_FETCH_SIZE = 1000  # rows per batch when streaming results
+    DB_BUSY_TIMEOUT = 30  # seconds SQLite waits for the write lock
     
-    # Fare Settings
+    # Fare Settings (defaults when FARES_FILE is missing; see utils.config_registry)
+    FARES_FILE = os.getenv('FARES_FILE', 'data/fares.json')
+    ROUTES_FILE = os.getenv('ROUTES_FILE', 'data/routes.json')
+    CONFIG_RELOAD_INTERVAL = 5  # seconds between checks for changed files
     BASE_FARES = {
         "regular": 13.00,
         "student": 11.00,
@@ -18,6 +25,59 @@ class Config:
     CURRENCY = "PHP"
     TIMEZONE = "Asia/Manila"
     
+    # Forecasting
+    FORECAST_ALPHA = 0.2  # level smoothing
+    FORECAST_GAMMA = 0.3  # hour-of-week seasonal smoothing
+    FORECAST_HISTORY_DAYS = 56
+    
+    # Dispatch
+    ROUTE_CYCLE_MINUTES = 60  # one full round trip
+    DISPATCH_MIN_UNITS_PER_ROUTE = 1
+    DISPATCH_PRESSURE_THRESHOLD = 0.8  # load per available seat
+    DISPATCH_PRESSURE_GAP = 0.3
+    DISPATCH_AVERAGE_RIDE_MINUTES = 20  # turns forecast boardings per hour into load on board
+    
+    # Depot monitor
+    MONITOR_POLL_SECONDS = 1.0
+    MONITOR_UNIT_TIMEOUT_MINUTES = 120  # units silent this long are treated as off duty
+    MONITOR_TRANSACTION_LAG = 5  # seconds; leaves time for in-flight writes to commit
+    
+    # Instrumentation
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+    PROFILER_INTERVAL = 0.005  # seconds between stack samples
+    METRICS_DIR = "metrics/"  # each instrumented process exports its metrics here
+    METRICS_EXPORT_INTERVAL = 10  # seconds
+    METRICS_MAX_AGE = 24 * 3600  # ignore exports older than this (seconds)
+    
+    # Anomaly detection
+    ANOMALY_DECAY = 0.02  # weight of each new transaction in rolling statistics
+    ANOMALY_MIN_EVENTS = 20
+    ANOMALY_Z_THRESHOLD = 4.0
+    ANOMALY_MIN_STD = 1.0  # pesos
+    ANOMALY_DISCOUNT_MARGIN = 0.25
+    ANOMALY_UNDERPAID_RATIO = 0.05
+    ANOMALY_REVENUE_DIP = 0.5  # fraction below forecast
+    ANOMALY_MIN_EXPECTED_REVENUE = 100.0
+    ANOMALY_ALERT_COOLDOWN_MINUTES = 30
+    ANOMALY_MAX_ALERTS = 500
+    ANOMALY_BASELINE_DAYS = 7  # history used to seed the fleet-wide discount share
+    
+    # Seat sensors
+    SENSOR_DEBOUNCE_SECONDS = 2.0  # a seat change must hold this long to count
+    SENSOR_SAMPLE_SECONDS = 1.0
+    SENSOR_SEGMENT_SECONDS = 300  # longest trip segment before it is closed
+    SENSOR_MIN_SEGMENT_SECONDS = 30  # boardings closer together than this are one stop
+    SENSOR_FLUSH_SEGMENTS = 50
+    SENSOR_DISCREPANCY_THRESHOLD = 2.0  # seats
+    
+    # End-of-day reconciliation
+    RECONCILE_WORKERS = os.cpu_count() or 1
+    RECONCILE_CHUNK_SIZE = 50  # units per worker task
+    RECONCILE_TOLERANCE = 0.01  # pesos
+    
+    # Admin
+    ADMIN_PAGE_SIZE = 20
+    
     # Web Settings
     SECRET_KEY = os.getenv('SECRET_KEY', 'your-secret-key-here')
     WEB_HOST = '0.0.0.0'
@@ -0,0 +1,199 @@
+import csv
+import io
+import os
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Iterator
+from config import Config
+
+
+class StorageBackend(ABC):
+    """Interface the query classes use to reach a database
+
+    Queries are written once with "?" placeholders and portable SQL;
+    each backend translates them to its own dialect and supplies its
+    own connection handling, streaming reads and bulk writes.
+    """
+    name = None
+
+    @abstractmethod
+    def get_connection(self):
+        """Context manager yielding a connection"""
+
+    def translate(self, query: str) -> str:
+        """Adapt a portable query to this backend's dialect"""
+        return query
+
+    def translate_schema(self, schema: str) -> str:
+        """Adapt portable DDL to this backend's dialect"""
+        return schema
+
+    def cursor(self, conn):
+        return conn.cursor()
+
+    def execute(self, query: str, params: tuple = ()) -> list:
+        with self.get_connection() as conn:
+            cursor = self.cursor(conn)
+            cursor.execute(self.translate(query), params)
+            rows = cursor.fetchall() if cursor.description else []
+            conn.commit()
+            return rows
+
+    def execute_many(self, query: str, params_list: list):
+        with self.get_connection() as conn:
+            cursor = self.cursor(conn)
+            cursor.executemany(self.translate(query), params_list)
+            conn.commit()
+
+    def iter_query(self, query: str, params: tuple = (), batch_size: int = None) -> Iterator:
+        """Stream rows without loading the whole result into memory"""
+        batch_size = batch_size or Config.DB_FETCH_SIZE
+        with self.get_connection() as conn:
+            cursor = self.cursor(conn)
+            cursor.execute(self.translate(query), params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def bulk_insert(self, table: str, columns: List[str], rows: list):
+        """Insert many rows in a single round of work"""
+        placeholders = ", ".join("?" for _ in columns)
+        self.execute_many(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})", rows
+        )
+
+    @abstractmethod
+    def executescript(self, script: str):
+        """Run several DDL statements"""
+
+
+class SQLiteBackend(StorageBackend):
+    """Local single-file database (one writer at a time)"""
+    name = "sqlite"
+
+    def __init__(self, database_url: str):
+        self.db_path = database_url.replace('sqlite:///', '', 1)
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def get_connection(self):
+        conn = sqlite3.connect(self.db_path, timeout=Config.DB_BUSY_TIMEOUT)
+        conn.row_factory = sqlite3.Row  # Enable dict-like access
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def executescript(self, script: str):
+        with self.get_connection() as conn:
+            conn.executescript(self.translate_schema(script))
+            conn.commit()
+
+
+class PostgresBackend(StorageBackend):
+    """PostgreSQL with pooled connections, COPY bulk loads and server-side cursors"""
+    name = "postgresql"
+
+    def __init__(self, database_url: str):
+        try:
+            import psycopg2
+            import psycopg2.extras
+            import psycopg2.pool
+        except ImportError:
+            raise ImportError("The PostgreSQL backend needs psycopg2 (pip install psycopg2-binary)")
+
+        self._extras = psycopg2.extras
+        self.pool = psycopg2.pool.ThreadedConnectionPool(1, Config.DB_POOL_SIZE, database_url)
+        # getconn raises PoolError once the pool is exhausted; callers
+        # wait here for a free connection instead
+        self._available = threading.BoundedSemaphore(Config.DB_POOL_SIZE)
+
+    @contextmanager
+    def get_connection(self):
+        if not self._available.acquire(timeout=Config.DB_POOL_TIMEOUT):
+            raise TimeoutError(f"No database connection free after {Config.DB_POOL_TIMEOUT}s")
+        try:
+            conn = self.pool.getconn()
+            try:
+                yield conn
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self.pool.putconn(conn)
+        finally:
+            self._available.release()
+
+    def translate(self, query: str) -> str:
+        return query.replace('%', '%%').replace('?', '%s')
+
+    def translate_schema(self, schema: str) -> str:
+        return schema.replace("INTEGER PRIMARY KEY AUTOINCREMENT", "BIGSERIAL PRIMARY KEY")
+
+    def cursor(self, conn, name: str = None):
+        return conn.cursor(name=name, cursor_factory=self._extras.RealDictCursor)
+
+    def iter_query(self, query: str, params: tuple = (), batch_size: int = None) -> Iterator:
+        # A named cursor keeps the result on the server and fetches it in batches
+        with self.get_connection() as conn:
+            cursor = self.cursor(conn, name=f"jms_{uuid.uuid4().hex}")
+            cursor.itersize = batch_size or Config.DB_FETCH_SIZE
+            try:
+                cursor.execute(self.translate(query), params)
+                yield from cursor
+            finally:
+                cursor.close()
+                conn.commit()
+
+    def execute_many(self, query: str, params_list: list):
+        # executemany in psycopg2 is one round trip per row; batch them instead
+        with self.get_connection() as conn:
+            self._extras.execute_batch(conn.cursor(), self.translate(query), params_list)
+            conn.commit()
+
+    def bulk_insert(self, table: str, columns: List[str], rows: list):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(['\\N' if value is None else value for value in row])
+        buffer.seek(0)
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buffer
+            )
+            conn.commit()
+
+    def executescript(self, script: str):
+        with self.get_connection() as conn:
+            conn.cursor().execute(self.translate_schema(script))
+            conn.commit()
+
+
+# One backend (and so one connection pool) per URL in each process
+_backends = {}
+
+
+def create_backend(database_url: str) -> StorageBackend:
+    """Pick a backend from the scheme of a database URL"""
+    key = (database_url, os.getpid())
+    if key in _backends:
+        return _backends[key]
+
+    if database_url.startswith('sqlite:///'):
+        backend = SQLiteBackend(database_url)
+    elif database_url.startswith(('postgresql://', 'postgres://')):
+        backend = PostgresBackend(database_url)
+    else:
+        raise ValueError(f"Unsupported database URL: {database_url}")
+    _backends[key] = backend
+    return backend
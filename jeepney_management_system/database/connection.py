@@ -1,40 +1,42 @@
-import sqlite3
-import os
-from contextlib import contextmanager
 from config import Config
+from database.backends import create_backend
+from utils.metrics import timed, counter
+
+rows_written = counter("db_execute_many_rows_total", "Parameter rows passed to execute_many")
+rows_bulk_loaded = counter("db_bulk_insert_rows_total", "Rows written through bulk_insert")
 
 class DatabaseManager:
     # This handles database connections and operations
-    
-    def __init__(self):
-        self.db_path = Config.DATABASE_URL.replace('sqlite:///', '')
-        self._ensure_database_exists()
-    
-    def _ensure_database_exists(self):
-        # This creates a database directory if it doesn't exist
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-    
-    @contextmanager
+
+    def __init__(self, database_url: str = None):
+        # The backend (SQLite, PostgreSQL) is chosen from the URL scheme
+        self.backend = create_backend(database_url or Config.DATABASE_URL)
+
     def get_connection(self):
         # Context manager for database connections
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dict-like access
-        try:
-            yield conn
-        finally:
-            conn.close()
-    
+        return self.backend.get_connection()
+
+    @timed("db_execute_query_seconds")
     def execute_query(self, query: str, params: tuple = ()):
         # Execute a single query
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            conn.commit()
-            return cursor.fetchall()
-    
+        return self.backend.execute(query, params)
+
+    @timed("db_execute_many_seconds")
     def execute_many(self, query: str, params_list: list):
         # Execute multiple queries with different parameters
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.executemany(query, params_list)
-            conn.commit()
+        self.backend.execute_many(query, params_list)
+        rows_written.inc(len(params_list))
+
+    def iter_query(self, query: str, params: tuple = (), batch_size: int = None):
+        # Stream rows in batches (server-side cursor on PostgreSQL)
+        return self.backend.iter_query(query, params, batch_size)
+
+    @timed("db_bulk_insert_seconds")
+    def bulk_insert(self, table: str, columns: list, rows: list):
+        # Load many rows at once (COPY on PostgreSQL)
+        self.backend.bulk_insert(table, columns, rows)
+        rows_bulk_loaded.inc(len(rows))
+
+    def executescript(self, script: str):
+        # Run several DDL statements, adapted to the backend's dialect
+        self.backend.executescript(script)
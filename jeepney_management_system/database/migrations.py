@@ -1,4 +1,95 @@
-def setup_database():
-    """Setup database tables"""
-    print("🗄️ Database setup not implemented yet!")
-    print("Coming soon in Phase 2...")
\ No newline at end of file
+from database.connection import DatabaseManager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jeepneys (
+    jeepney_id TEXT PRIMARY KEY,
+    plate_number TEXT NOT NULL,
+    driver_name TEXT NOT NULL,
+    route_id TEXT NOT NULL,
+    capacity INTEGER NOT NULL DEFAULT 20,
+    status TEXT NOT NULL DEFAULT 'active',
+    passengers INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id TEXT PRIMARY KEY,
+    jeepney_id TEXT NOT NULL REFERENCES jeepneys (jeepney_id),
+    passenger_type TEXT NOT NULL,
+    required_fare DOUBLE PRECISION NOT NULL,
+    amount_paid DOUBLE PRECISION NOT NULL,
+    change_given DOUBLE PRECISION NOT NULL,
+    payment_status TEXT NOT NULL,
+    boarding_location TEXT,
+    destination TEXT,
+    transaction_time TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS anomaly_alerts (
+    alert_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    detected_at TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    entity_id TEXT NOT NULL,
+    value DOUBLE PRECISION,
+    expected DOUBLE PRECISION,
+    message TEXT
+);
+
+CREATE TABLE IF NOT EXISTS occupancy_segments (
+    segment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    jeepney_id TEXT NOT NULL REFERENCES jeepneys (jeepney_id),
+    segment_start TEXT NOT NULL,
+    segment_end TEXT NOT NULL,
+    samples INTEGER NOT NULL,
+    sensed_avg DOUBLE PRECISION NOT NULL,
+    sensed_min INTEGER NOT NULL,
+    sensed_max INTEGER NOT NULL,
+    fare_avg DOUBLE PRECISION NOT NULL,
+    discrepancy DOUBLE PRECISION NOT NULL,
+    flagged INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_occupancy_segments_jeepney_start
+    ON occupancy_segments (jeepney_id, segment_start);
+
+CREATE TABLE IF NOT EXISTS cash_turnins (
+    jeepney_id TEXT NOT NULL,
+    shift_date TEXT NOT NULL,
+    cash_turned_in DOUBLE PRECISION NOT NULL,
+    reported_passengers INTEGER NOT NULL,
+    reported_revenue DOUBLE PRECISION NOT NULL,
+    reported_change DOUBLE PRECISION NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (jeepney_id, shift_date)
+);
+
+CREATE TABLE IF NOT EXISTS forecast_models (
+    route_id TEXT PRIMARY KEY,
+    closed_through TEXT NOT NULL,
+    state TEXT NOT NULL
+);
+
+-- Keyset pagination seeks on (transaction_time, transaction_id)
+CREATE INDEX IF NOT EXISTS idx_transactions_time
+    ON transactions (transaction_time, transaction_id);
+CREATE INDEX IF NOT EXISTS idx_transactions_jeepney_time
+    ON transactions (jeepney_id, transaction_time, transaction_id);
+CREATE INDEX IF NOT EXISTS idx_jeepneys_plate
+    ON jeepneys (plate_number);
+CREATE INDEX IF NOT EXISTS idx_jeepneys_route
+    ON jeepneys (route_id);
+-- Reconciliation finds the units whose shift started on a day
+CREATE INDEX IF NOT EXISTS idx_jeepneys_created
+    ON jeepneys (created_at);
+-- The depot monitor polls for units changed since its last pass
+CREATE INDEX IF NOT EXISTS idx_jeepneys_updated
+    ON jeepneys (updated_at);
+"""
+
+
+def setup_database(db_manager: DatabaseManager = None):
+    """Setup database tables (safe to run more than once)"""
+    db_manager = db_manager or DatabaseManager()
+    db_manager.executescript(SCHEMA)
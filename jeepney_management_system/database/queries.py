@@ -1,31 +1,415 @@
+import json
+from datetime import datetime, timedelta
+from config import Config
+from database.connection import DatabaseManager
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _next_day(date: str) -> str:
+    """Return the day after a YYYY-MM-DD date string"""
+    return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
 class JeepneyQueries:
     """Database queries for jeepney operations"""
-    
-    def __init__(self):
-        pass  # For now, just a placeholder
-    
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
     def save_jeepney(self, jeepney):
         """Save jeepney to database"""
-        # Placeholder - will implement later
-        pass
+        self.db.execute_query(
+            """INSERT INTO jeepneys
+               (jeepney_id, plate_number, driver_name, route_id, capacity, status,
+                passengers, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (jeepney_id) DO UPDATE SET
+                   plate_number = excluded.plate_number,
+                   driver_name = excluded.driver_name,
+                   route_id = excluded.route_id,
+                   capacity = excluded.capacity,
+                   status = excluded.status,
+                   passengers = excluded.passengers,
+                   updated_at = excluded.updated_at""",
+            (jeepney.jeepney_id, jeepney.plate_number, jeepney.driver_name,
+             jeepney.route_id, jeepney.capacity, jeepney.status,
+             jeepney.get_current_occupancy(), jeepney.created_at.strftime(DATETIME_FORMAT),
+             datetime.now().strftime(DATETIME_FORMAT))
+        )
+
+    def update_occupancy(self, jeepney):
+        """Record a unit's current passenger count after a boarding or alighting"""
+        self.db.execute_query(
+            "UPDATE jeepneys SET passengers = ?, updated_at = ? WHERE jeepney_id = ?",
+            (jeepney.get_current_occupancy(), datetime.now().strftime(DATETIME_FORMAT),
+             jeepney.jeepney_id)
+        )
+
+    def get_jeepneys_updated_since(self, since: str):
+        """Get jeepneys whose state changed at or after a timestamp"""
+        return self.db.execute_query(
+            "SELECT * FROM jeepneys WHERE updated_at >= ? ORDER BY updated_at", (since,)
+        )
+
+    def get_jeepney(self, jeepney_id: str):
+        """Get a single jeepney row"""
+        rows = self.db.execute_query(
+            "SELECT * FROM jeepneys WHERE jeepney_id = ?", (jeepney_id,)
+        )
+        return rows[0] if rows else None
+
+    def get_jeepneys_page(self, after_id: str = None, page_size: int = None,
+                          route_id: str = None, plate_number: str = None, status: str = None):
+        """Get one page of jeepneys ordered by ID, starting after after_id"""
+        conditions, params = [], []
+        if after_id is not None:
+            conditions.append("jeepney_id > ?")
+            params.append(after_id)
+        if route_id:
+            conditions.append("route_id = ?")
+            params.append(route_id)
+        if plate_number:
+            conditions.append("plate_number = ?")
+            params.append(plate_number)
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+
+        query = "SELECT * FROM jeepneys"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY jeepney_id LIMIT ?"
+        params.append(page_size or Config.ADMIN_PAGE_SIZE)
+        return self.db.execute_query(query, tuple(params))
+
+    def iter_jeepney_pages(self, page_size: int = None, **filters):
+        """Yield jeepneys page by page (keyset pagination on jeepney_id)"""
+        page_size = page_size or Config.ADMIN_PAGE_SIZE
+        after_id = None
+        while True:
+            page = self.get_jeepneys_page(after_id, page_size, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after_id = page[-1]['jeepney_id']
 
 class TransactionQueries:
     """Database queries for transactions"""
-    
-    def __init__(self):
-        pass  # For now, just a placeholder
-    
+
+    COLUMNS = ["transaction_id", "jeepney_id", "passenger_type", "required_fare", "amount_paid",
+               "change_given", "payment_status", "boarding_location", "destination", "transaction_time"]
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
+    @staticmethod
+    def _transaction_row(transaction) -> tuple:
+        return (transaction.transaction_id, transaction.jeepney_id, transaction.passenger_type,
+                transaction.required_fare, transaction.amount_paid, transaction.change_given,
+                transaction.payment_status, transaction.boarding_location,
+                transaction.destination, transaction.transaction_time.strftime(DATETIME_FORMAT))
+
     def save_transaction(self, transaction):
         """Save transaction to database"""
-        # Placeholder - will implement later
-        pass
-    
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        self.db.execute_query(
+            f"INSERT INTO transactions ({', '.join(self.COLUMNS)}) VALUES ({placeholders})",
+            self._transaction_row(transaction)
+        )
+
+    def save_transactions(self, transactions: list):
+        """Save a batch of transactions through the backend's bulk path"""
+        self.db.bulk_insert("transactions", self.COLUMNS,
+                            [self._transaction_row(t) for t in transactions])
+
     def get_transactions_by_date(self, date, jeepney_id=None):
         """Get transactions by date"""
-        # Placeholder - will implement later
-        return []
-    
+        query = ("SELECT * FROM transactions "
+                 "WHERE transaction_time >= ? AND transaction_time < ?")
+        params = [date, _next_day(date)]
+        if jeepney_id:
+            query += " AND jeepney_id = ?"
+            params.append(jeepney_id)
+        query += " ORDER BY transaction_time"
+        return self.db.execute_query(query, tuple(params))
+
     def get_transactions_by_date_range(self, start_date, end_date):
-        """Get transactions by date range"""
-        # Placeholder - will implement later
-        return []
+        """Get transactions by date range (both dates inclusive)"""
+        return self.db.execute_query(
+            """SELECT * FROM transactions
+               WHERE transaction_time >= ? AND transaction_time < ?
+               ORDER BY transaction_time""",
+            (start_date, _next_day(end_date))
+        )
+
+    def iter_transactions_by_date_range(self, start_date, end_date, batch_size=None):
+        """Stream transactions in a date range without loading them all at once"""
+        return self.db.iter_query(
+            """SELECT * FROM transactions
+               WHERE transaction_time >= ? AND transaction_time < ?
+               ORDER BY transaction_time, transaction_id""",
+            (start_date, _next_day(end_date)),
+            batch_size
+        )
+
+    def get_transactions_page(self, after: tuple = None, page_size: int = None,
+                              start_date: str = None, end_date: str = None,
+                              jeepney_id: str = None, plate_number: str = None,
+                              route_id: str = None, payment_status: str = None):
+        """Get one page of transactions ordered by time
+
+        after is the (transaction_time, transaction_id) of the last row of the
+        previous page. Seeking past it through the index keeps every page as
+        cheap as the first, unlike OFFSET which rescans all skipped rows.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("(t.transaction_time, t.transaction_id) > (?, ?)")
+            params.extend(after)
+        if start_date:
+            conditions.append("t.transaction_time >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("t.transaction_time < ?")
+            params.append(_next_day(end_date))
+        if jeepney_id:
+            conditions.append("t.jeepney_id = ?")
+            params.append(jeepney_id)
+        if plate_number:
+            conditions.append("j.plate_number = ?")
+            params.append(plate_number)
+        if route_id:
+            conditions.append("j.route_id = ?")
+            params.append(route_id)
+        if payment_status:
+            conditions.append("t.payment_status = ?")
+            params.append(payment_status)
+
+        query = ("SELECT t.*, j.plate_number, j.route_id FROM transactions t "
+                 "JOIN jeepneys j ON j.jeepney_id = t.jeepney_id")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY t.transaction_time, t.transaction_id LIMIT ?"
+        params.append(page_size or Config.ADMIN_PAGE_SIZE)
+        return self.db.execute_query(query, tuple(params))
+
+    def iter_transaction_pages(self, page_size: int = None, **filters):
+        """Yield transactions page by page (keyset pagination on time and ID)"""
+        page_size = page_size or Config.ADMIN_PAGE_SIZE
+        after = None
+        while True:
+            page = self.get_transactions_page(after, page_size, **filters)
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            after = (page[-1]['transaction_time'], page[-1]['transaction_id'])
+
+    def get_transactions_after(self, after: tuple, until: str, limit: int = None):
+        """Get transactions after a (transaction_time, transaction_id) cursor and before until
+
+        Used to follow every unit's writes; rows carry the unit's route and driver.
+        """
+        return self.db.execute_query(
+            """SELECT t.*, j.route_id, j.driver_name FROM transactions t
+               JOIN jeepneys j ON j.jeepney_id = t.jeepney_id
+               WHERE (t.transaction_time, t.transaction_id) > (?, ?) AND t.transaction_time < ?
+               ORDER BY t.transaction_time, t.transaction_id
+               LIMIT ?""",
+            (after[0], after[1], until, limit or Config.DB_FETCH_SIZE)
+        )
+
+    def get_passenger_type_counts(self, start_date, end_date):
+        """Get the number of transactions per passenger type (both dates inclusive)"""
+        return self.db.execute_query(
+            """SELECT passenger_type, COUNT(*) AS passengers FROM transactions
+               WHERE transaction_time >= ? AND transaction_time < ?
+               GROUP BY passenger_type""",
+            (start_date, _next_day(end_date))
+        )
+
+    def get_hourly_rollups(self, start_date, end_date):
+        """Get passengers and net revenue per route, day and hour (both dates inclusive)"""
+        return self.db.execute_query(
+            """SELECT j.route_id AS route_id,
+                      substr(t.transaction_time, 1, 10) AS day,
+                      CAST(substr(t.transaction_time, 12, 2) AS INTEGER) AS hour,
+                      COUNT(*) AS passengers,
+                      SUM(t.amount_paid - t.change_given) AS revenue
+               FROM transactions t
+               JOIN jeepneys j ON j.jeepney_id = t.jeepney_id
+               WHERE t.transaction_time >= ? AND t.transaction_time < ?
+               GROUP BY j.route_id, day, hour
+               ORDER BY day, hour""",
+            (start_date, _next_day(end_date))
+        )
+
+class AnomalyQueries:
+    """Database queries for anomaly alerts"""
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
+    def save_alert(self, alert: dict):
+        """Save an alert raised by AnomalyDetector"""
+        self.db.execute_query(
+            """INSERT INTO anomaly_alerts
+               (detected_at, kind, entity_type, entity_id, value, expected, message)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (alert["detected_at"].strftime(DATETIME_FORMAT), alert["kind"], alert["entity_type"],
+             alert["entity_id"], alert["value"], alert["expected"], alert["message"])
+        )
+
+    def iter_alert_pages(self, page_size: int = None, kind: str = None):
+        """Yield alerts newest first, page by page (keyset pagination on alert_id)"""
+        page_size = page_size or Config.ADMIN_PAGE_SIZE
+        before_id = None
+        while True:
+            conditions, params = [], []
+            if before_id is not None:
+                conditions.append("alert_id < ?")
+                params.append(before_id)
+            if kind:
+                conditions.append("kind = ?")
+                params.append(kind)
+            query = "SELECT * FROM anomaly_alerts"
+            if conditions:
+                query += " WHERE " + " AND ".join(conditions)
+            query += " ORDER BY alert_id DESC LIMIT ?"
+            params.append(page_size)
+
+            page = self.db.execute_query(query, tuple(params))
+            if not page:
+                return
+            yield page
+            if len(page) < page_size:
+                return
+            before_id = page[-1]['alert_id']
+
+class SensorQueries:
+    """Database queries for aggregated seat-sensor segments"""
+
+    COLUMNS = ["jeepney_id", "segment_start", "segment_end", "samples", "sensed_avg",
+               "sensed_min", "sensed_max", "fare_avg", "discrepancy", "flagged"]
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
+    def save_segments(self, segments: list):
+        """Save a batch of closed occupancy segments"""
+        self.db.bulk_insert(
+            "occupancy_segments",
+            self.COLUMNS,
+            [(s["jeepney_id"],
+              datetime.fromtimestamp(s["segment_start"]).strftime(DATETIME_FORMAT),
+              datetime.fromtimestamp(s["segment_end"]).strftime(DATETIME_FORMAT),
+              s["samples"], s["sensed_avg"], s["sensed_min"], s["sensed_max"],
+              s["fare_avg"], s["discrepancy"], 1 if s["flagged"] else 0)
+             for s in segments]
+        )
+
+    def get_segments_by_date(self, date, jeepney_id=None):
+        """Get occupancy segments that started on a date"""
+        query = ("SELECT * FROM occupancy_segments "
+                 "WHERE segment_start >= ? AND segment_start < ?")
+        params = [date, _next_day(date)]
+        if jeepney_id:
+            query += " AND jeepney_id = ?"
+            params.append(jeepney_id)
+        query += " ORDER BY segment_start"
+        return self.db.execute_query(query, tuple(params))
+
+class ReconciliationQueries:
+    """Database queries for shift-end cash turn-ins and daily unit totals"""
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
+    def save_turnin(self, jeepney_id: str, shift_date: str, cash_turned_in: float, totals: dict):
+        """Record the cash a driver turned in with the totals their unit reported
+
+        A driver who restarts a unit during the shift turns in once per
+        session, so later turn-ins add to the shift's cash and totals.
+        """
+        self.db.execute_query(
+            """INSERT INTO cash_turnins
+               (jeepney_id, shift_date, cash_turned_in, reported_passengers,
+                reported_revenue, reported_change, recorded_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (jeepney_id, shift_date) DO UPDATE SET
+                   cash_turned_in = cash_turnins.cash_turned_in + excluded.cash_turned_in,
+                   reported_passengers = cash_turnins.reported_passengers + excluded.reported_passengers,
+                   reported_revenue = cash_turnins.reported_revenue + excluded.reported_revenue,
+                   reported_change = cash_turnins.reported_change + excluded.reported_change,
+                   recorded_at = excluded.recorded_at""",
+            (jeepney_id, shift_date, cash_turned_in, totals["passengers"],
+             totals["revenue"], totals["change"], datetime.now().strftime(DATETIME_FORMAT))
+        )
+
+    def get_turnins_by_date(self, shift_date: str):
+        """Get every turn-in recorded for a shift date"""
+        return self.db.execute_query(
+            "SELECT * FROM cash_turnins WHERE shift_date = ?", (shift_date,)
+        )
+
+    def get_active_unit_ids(self, date: str):
+        """Get the IDs of units whose shift started on a date and that have transactions"""
+        rows = self.db.execute_query(
+            """SELECT j.jeepney_id FROM jeepneys j
+               WHERE j.created_at >= ? AND j.created_at < ?
+                 AND EXISTS (SELECT 1 FROM transactions t WHERE t.jeepney_id = j.jeepney_id)""",
+            (date, _next_day(date))
+        )
+        return [row['jeepney_id'] for row in rows]
+
+    def get_unit_totals(self, date: str, jeepney_ids: list):
+        """Get persisted per-unit totals for shifts started on a date in one grouped query
+
+        Transactions count towards the day their unit's shift started, so a
+        shift that runs past midnight is reconciled against a single turn-in.
+        """
+        if not jeepney_ids:
+            return []
+        placeholders = ", ".join("?" for _ in jeepney_ids)
+        return self.db.execute_query(
+            f"""SELECT t.jeepney_id,
+                       COUNT(*) AS passengers,
+                       SUM(t.amount_paid) AS revenue,
+                       SUM(t.change_given) AS change_total,
+                       SUM(CASE WHEN t.payment_status = 'exact' THEN 1 ELSE 0 END) AS exact_payments
+                FROM transactions t
+                JOIN jeepneys j ON j.jeepney_id = t.jeepney_id
+                WHERE j.created_at >= ? AND j.created_at < ?
+                  AND t.jeepney_id IN ({placeholders})
+                GROUP BY t.jeepney_id""",
+            (date, _next_day(date), *jeepney_ids)
+        )
+
+class ForecastQueries:
+    """Database queries for persisted forecasting model state"""
+
+    def __init__(self, db_manager: DatabaseManager = None):
+        self.db = db_manager or DatabaseManager()
+
+    def save_models(self, closed_through: str, states: dict):
+        """Save every route's model state as of the last closed day"""
+        self.db.execute_many(
+            """INSERT INTO forecast_models (route_id, closed_through, state)
+               VALUES (?, ?, ?)
+               ON CONFLICT (route_id) DO UPDATE SET
+                   closed_through = excluded.closed_through,
+                   state = excluded.state""",
+            [(route_id, closed_through, json.dumps(state)) for route_id, state in states.items()]
+        )
+
+    def load_models(self):
+        """Get (closed_through, {route_id: state}) or (None, {}) if nothing is saved"""
+        rows = self.db.execute_query("SELECT * FROM forecast_models")
+        if not rows:
+            return None, {}
+        closed_through = max(row['closed_through'] for row in rows)
+        return closed_through, {row['route_id']: json.loads(row['state']) for row in rows}
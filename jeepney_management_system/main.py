@@ -1,18 +1,95 @@
+import os
 import sys
 import argparse
+from datetime import datetime, timedelta
 from cli.driver_interface import DriverInterface
 from cli.admin_interface import AdminInterface
 from web.app import create_web_app
 from database.connection import DatabaseManager
 from database.migrations import setup_database
+from database.queries import ForecastQueries, AnomalyQueries
+from config import Config
+from services.forecasting import ForecastingService
+from services.depot_monitor import DepotMonitor
+from services.anomaly_detector import AnomalyDetector
+from services.reconciliation import ReconciliationService
+from services.report_generator import ReportGenerator
+from utils import metrics
+from utils.config_registry import get_registry
+
+def run_reconciliation(date: str, workers: int = None):
+    """Close a day across all units, write the discrepancy report and update the forecasts"""
+    service = ReconciliationService(workers=workers)
+    results = service.reconcile_day(date)
+    
+    # Fold the closed day into the saved demand models (today stays open until it ends)
+    forecasting = ForecastingService(forecast_queries=ForecastQueries())
+    forecasting.refresh(date)
+    print(f"🔮 Demand forecasts updated through {forecasting.last_closed_date:%Y-%m-%d} "
+          f"({len(forecasting.models)} routes)")
+    
+    if not results:
+        print(f"No transactions or turn-ins recorded for {date}.")
+        return
+    
+    summary = service.summarize(results)
+    path = ReportGenerator().write_discrepancy_report(date, results)
+    print(f"📅 Reconciled {summary['units']} units for {date}")
+    print(f"📊 Net revenue: ₱{summary['net_revenue']:.2f} | 💵 Cash turned in: ₱{summary['cash_turned_in']:.2f}")
+    for status, count in sorted(summary["status_breakdown"].items()):
+        print(f"   {status}: {count}")
+    print(f"📄 Report written to {path}")
+
+def print_dispatch_event(event: dict):
+    """Print a dispatch suggestion or headway change from the scheduler"""
+    if event["action"] == "dispatch":
+        print(f"🚦 Dispatch {event['jeepney_id']}: route {event['from_route']} → {event['to_route']} "
+              f"(load {event['from_pressure']:.2f} → {event['to_pressure']:.2f} per seat)")
+    elif event["headway_minutes"] is None:
+        print(f"⏱️ Route {event['route_id']}: no active units")
+    else:
+        print(f"⏱️ Route {event['route_id']}: {event['active_units']} units, "
+              f"headway {event['headway_minutes']:.1f} min")
+
+def run_monitor():
+    """Watch every unit from the depot: dispatch, headway changes and anomaly alerts"""
+    forecasting = ForecastingService(forecast_queries=ForecastQueries())
+    yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+    forecasting.refresh(yesterday)
+    
+    alert_queries = AnomalyQueries()
+    
+    def on_alert(alert: dict):
+        alert_queries.save_alert(alert)
+        print(f"⚠️ {alert['kind']} on {alert['entity_type']} {alert['entity_id']}: {alert['message']}")
+    
+    detector = AnomalyDetector(alert_sink=on_alert, forecasting_service=forecasting)
+    monitor = DepotMonitor(forecasting_service=forecasting, anomaly_detector=detector)
+    monitor.scheduler.subscribe(print_dispatch_event)
+    print("Depot monitor running (Ctrl+C to stop)")
+    try:
+        monitor.run()
+    except KeyboardInterrupt:
+        print("\nMonitor stopped.")
 
 def main():
     """Main application entry point"""
     parser = argparse.ArgumentParser(description='Jeepney Management System')
-    parser.add_argument('--mode', choices=['driver', 'admin', 'web'], 
+    parser.add_argument('--mode', choices=['driver', 'admin', 'monitor', 'web'], 
                        default='driver', help='Application mode')
     parser.add_argument('--setup-db', action='store_true', 
                        help='Setup database tables')
+    parser.add_argument('--reconcile', metavar='DATE', nargs='?', const=Config.get_current_date(),
+                       help='Reconcile every unit for a day (default: today) and write a discrepancy report')
+    parser.add_argument('--workers', type=int, default=None,
+                       help='Worker processes for --reconcile')
+    parser.add_argument('--sensors', action='store_true',
+                       help='Stream (simulated) seat-sensor readings in driver mode')
+    parser.add_argument('--metrics', action='store_true',
+                       help='Enable hot-path instrumentation')
+    parser.add_argument('--profile', metavar='OUTPUT', nargs='?',
+                       const=os.path.join(Config.REPORTS_DIR, 'profile.txt'),
+                       help='Run the sampling profiler and dump the hottest stacks on exit')
     
     args = parser.parse_args()
     
@@ -22,16 +99,50 @@ def main():
         print("✅ Database setup complete!")
         return
     
-    # Run application based on mode
-    if args.mode == 'driver':
-        driver_app = DriverInterface()
-        driver_app.run()
-    elif args.mode == 'admin':
-        admin_app = AdminInterface()
-        admin_app.run()
-    elif args.mode == 'web':
-        web_app = create_web_app()
-        web_app.run(debug=True, host='0.0.0.0', port=5000)
+    setup_database()
+    
+    if args.reconcile:
+        run_reconciliation(args.reconcile, args.workers)
+        return
+    
+    if args.metrics:
+        metrics.enable()
+    
+    profiler = None
+    if args.profile:
+        profiler = metrics.SamplingProfiler()
+        profiler.start()
+    
+    # Metrics live in each process; export them so admin and /metrics can show them
+    exporter = None
+    if args.metrics or args.profile:
+        exporter = metrics.MetricsExporter(args.mode, profiler)
+        exporter.start()
+    
+    try:
+        # Run application based on mode
+        if args.mode == 'driver':
+            driver_app = DriverInterface(sensors=args.sensors)
+            driver_app.run()
+        elif args.mode == 'admin':
+            admin_app = AdminInterface(profiler)
+            admin_app.run()
+        elif args.mode == 'monitor':
+            run_monitor()
+        elif args.mode == 'web':
+            # The depot server picks up fare and route edits without restarting
+            get_registry().start_watcher()
+            web_app = create_web_app()
+            if web_app is not None:
+                web_app.run(debug=True, host='0.0.0.0', port=5000)
+    finally:
+        if profiler:
+            profiler.stop()
+        if exporter:
+            exporter.stop()  # writes a final snapshot
+        if profiler:
+            profiler.dump(args.profile)
+            print(f"🔥 Profile written to {args.profile}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,6 +3,8 @@ from typing import List, Optional
 from datetime import datetime
 from models.passenger import Passenger
 from models.transaction import Transaction
+from utils.metrics import timed
+from utils.config_registry import get_registry
 
 @dataclass
 class Jeepney:
@@ -19,6 +21,7 @@ class Jeepney:
     def __post_init__(self):
         self.created_at = datetime.now()
     
+    @timed("jeepney_add_passenger_seconds")
     def add_passenger(self, passenger: Passenger, transaction: Transaction):
         """Add passenger and record transaction"""
         if len(self.current_passengers) >= self.capacity:
@@ -27,6 +30,7 @@ class Jeepney:
         self.current_passengers.append(passenger)
         self.daily_transactions.append(transaction)
     
+    @timed("jeepney_remove_passenger_seconds")
     def remove_passenger(self, passenger_id: str):
         """Remove passenger when they alight"""
         self.current_passengers = [p for p in self.current_passengers 
@@ -40,9 +44,24 @@ class Jeepney:
         """Calculate total revenue for the day"""
         return sum(t.amount_paid for t in self.daily_transactions)
     
+    def get_daily_totals(self) -> dict:
+        """Get the day's revenue, change and payment efficiency"""
+        total_passengers = len(self.daily_transactions)
+        total_revenue = sum(t.amount_paid for t in self.daily_transactions)
+        total_change = sum(t.change_given for t in self.daily_transactions)
+        exact_payments = sum(1 for t in self.daily_transactions if t.payment_status == "exact")
+        return {
+            "passengers": total_passengers,
+            "revenue": total_revenue,
+            "change": total_change,
+            "net_revenue": total_revenue - total_change,
+            "exact_payments": exact_payments,
+            "payment_efficiency": (exact_payments / total_passengers) * 100 if total_passengers > 0 else 0
+        }
+    
     def get_passenger_count(self) -> dict:
         """Get passenger count by type"""
-        counts = {"regular": 0, "student": 0, "senior": 0, "pwd": 0}
+        counts = dict.fromkeys(get_registry().current().passenger_types, 0)
         for transaction in self.daily_transactions:
             if transaction.passenger_type in counts:
                 counts[transaction.passenger_type] += 1
@@ -3,7 +3,7 @@ from datetime import datetime
 from typing import Optional
 
 @dataclass
-class Transactions:
+class Transaction:
     # Represents a fare transactions
     transaction_id: str
     jeepney_id: str
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 from models.transaction import Transaction
 from database.queries import TransactionQueries
+from utils.metrics import timed
 
 class AnalyticsService:
     """Provides analytics and insights from transaction data"""
@@ -10,6 +11,7 @@ class AnalyticsService:
     def __init__(self):
         self.transaction_queries = TransactionQueries()
     
+    @timed("analytics_daily_summary_seconds")
     def get_daily_summary(self, date: str, jeepney_id: str = None) -> Dict[str, Any]:
         """Get daily summary of operations"""
         transactions = self.transaction_queries.get_transactions_by_date(date, jeepney_id)
@@ -33,6 +35,7 @@ class AnalyticsService:
             "average_fare": total_revenue / total_passengers if total_passengers > 0 else 0
         }
     
+    @timed("analytics_peak_hours_seconds")
     def get_peak_hours(self, date_range: int = 7) -> List[Dict[str, Any]]:
         """Analyze peak hours based on recent data"""
         end_date = datetime.now()
@@ -53,6 +56,7 @@ class AnalyticsService:
         
         return [{"hour": hour, "passenger_count": count} for hour, count in peak_hours]
     
+    @timed("analytics_route_performance_seconds")
     def get_route_performance(self, route_id: str, days: int = 30) -> Dict[str, Any]:
         """Analyze route performance metrics"""
         # Implementation would analyze route-specific data
@@ -0,0 +1,285 @@
+import math
+from array import array
+from collections import deque
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Optional, Callable
+from config import Config
+from utils.config_registry import get_registry
+
+
+class DecayedStats:
+    """Exponentially weighted mean and variance of a stream"""
+    __slots__ = ("alpha", "mean", "var", "weight")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.mean = 0.0
+        self.var = 0.0
+        self.weight = 0.0  # effective number of events, capped near 1 / alpha
+
+    def zscore(self, value: float) -> float:
+        std = max(math.sqrt(self.var), Config.ANOMALY_MIN_STD)
+        return (value - self.mean) / std
+
+    def update(self, value: float):
+        if self.weight == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            increment = self.alpha * diff
+            self.mean += increment
+            self.var = (1 - self.alpha) * (self.var + diff * increment)
+        self.weight = self.weight * (1 - self.alpha) + 1
+
+
+class DecayedRatio:
+    """Exponentially decayed share of events matching a condition"""
+    __slots__ = ("alpha", "hits", "weight")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.hits = 0.0
+        self.weight = 0.0
+
+    def update(self, hit: bool):
+        self.hits = self.hits * (1 - self.alpha) + (1 if hit else 0)
+        self.weight = self.weight * (1 - self.alpha) + 1
+
+    @property
+    def ratio(self) -> float:
+        return self.hits / self.weight if self.weight else 0.0
+
+
+class EntityStats:
+    """Rolling statistics for one unit or driver"""
+    __slots__ = ("change", "discounts", "underpaid", "last_alert", "last_unit", "spans_units")
+
+    def __init__(self, alpha: float):
+        self.change = DecayedStats(alpha)
+        self.discounts = DecayedRatio(alpha)
+        self.underpaid = DecayedRatio(alpha)
+        self.last_alert: Dict[str, datetime] = {}
+        self.last_unit = None
+        self.spans_units = False  # drivers only: seen on more than one unit
+
+
+class RouteRevenueWindow:
+    """Revenue for the current hour plus a fixed ring of the last 24 hours"""
+    __slots__ = ("hour_start", "revenue", "history")
+
+    def __init__(self, hour_start: Optional[datetime]):
+        self.hour_start = hour_start  # None until the route's first fare or flush
+        self.revenue = 0.0
+        self.history = array('d', [0.0] * 24)
+
+
+class AnomalyDetector:
+    """Flags unusual payment patterns from the live transaction stream
+
+    Every unit, driver and route keeps a fixed amount of state (decayed
+    statistics and a 24-slot revenue ring), so memory is bounded by fleet
+    size and each transaction costs the same regardless of history.
+
+    Fleet-wide comparisons and route revenue only mean something when the
+    detector sees every unit, so it runs in the depot monitor rather than
+    in a driver's process. A driver's own statistics only raise alerts
+    once they cover more than one unit; until then they would repeat the
+    unit's alerts.
+    """
+
+    def __init__(self, alert_sink: Callable[[Dict[str, Any]], None] = None,
+                 forecasting_service=None):
+        self.alpha = Config.ANOMALY_DECAY
+        self.alert_sink = alert_sink
+        self.forecasting_service = forecasting_service
+        self.registry = get_registry()
+
+        self.units: Dict[str, Dict[str, str]] = {}  # jeepney_id -> driver and route
+        self.unit_stats: Dict[str, EntityStats] = {}
+        self.driver_stats: Dict[str, EntityStats] = {}
+        self.fleet_discounts = DecayedRatio(self.alpha / 10)
+        self.route_revenue: Dict[str, RouteRevenueWindow] = {}
+        self.alerts = deque(maxlen=Config.ANOMALY_MAX_ALERTS)
+
+    def register_unit(self, jeepney):
+        """Tell the detector which driver and route a unit belongs to"""
+        self.set_unit(jeepney.jeepney_id, jeepney.driver_name, jeepney.route_id)
+
+    def set_unit(self, jeepney_id: str, driver: str, route_id: str):
+        self.units[jeepney_id] = {"driver": driver, "route_id": route_id}
+        # A route is checked against its forecast from its first unit, even if it records no fares
+        if route_id not in self.route_revenue:
+            self.route_revenue[route_id] = RouteRevenueWindow(None)
+
+    def seed_fleet_baseline(self, type_counts: Dict[str, int]):
+        """Start the fleet-wide discount share from historical passenger type counts"""
+        total = sum(type_counts.values())
+        if total == 0:
+            return
+        discount_types = self.registry.current().discount_types
+        share = sum(count for ptype, count in type_counts.items() if ptype in discount_types) / total
+        # Weight it like a long steady stream, so a few live events don't swamp it
+        weight = min(total, 1 / self.fleet_discounts.alpha)
+        self.fleet_discounts.hits = share * weight
+        self.fleet_discounts.weight = weight
+
+    def observe(self, transaction, emit: bool = True) -> List[Dict[str, Any]]:
+        """Update rolling statistics with one transaction and return any new alerts
+
+        With emit=False the statistics are updated (e.g. while catching up
+        on history) but no alerts are raised.
+        """
+        unit = self.units.get(transaction.jeepney_id)
+        when = transaction.transaction_time
+        is_discount = transaction.passenger_type in self.registry.current().discount_types
+        alerts = []
+
+        self.fleet_discounts.update(is_discount)
+
+        entities = [("unit", transaction.jeepney_id, self.unit_stats)]
+        if unit:
+            entities.append(("driver", unit["driver"], self.driver_stats))
+
+        for entity_type, entity_id, table in entities:
+            stats = table.get(entity_id)
+            if stats is None:
+                stats = table[entity_id] = EntityStats(self.alpha)
+            if stats.last_unit is not None and stats.last_unit != transaction.jeepney_id:
+                stats.spans_units = True
+            stats.last_unit = transaction.jeepney_id
+            can_alert = emit and (entity_type == "unit" or stats.spans_units)
+            alerts.extend(self._check_entity(entity_type, entity_id, stats, transaction,
+                                             is_discount, when, can_alert))
+
+        if unit:
+            alerts.extend(self._track_revenue(
+                unit["route_id"], when, transaction.amount_paid - transaction.change_given
+            ))
+
+        if not emit:
+            return []
+        for alert in alerts:
+            self._emit(alert)
+        return alerts
+
+    def flush(self, now: datetime = None) -> List[Dict[str, Any]]:
+        """Close finished hours on every route (for routes with no recent traffic)"""
+        now = now or datetime.now()
+        alerts = []
+        for route_id in list(self.route_revenue):
+            alerts.extend(self._track_revenue(route_id, now, 0.0))
+        for alert in alerts:
+            self._emit(alert)
+        return alerts
+
+    def get_hourly_revenue(self, route_id: str) -> Dict[int, float]:
+        """Revenue per hour of day over the last 24 closed hours"""
+        window = self.route_revenue.get(route_id)
+        if window is None:
+            return {}
+        return {hour: window.history[hour] for hour in range(24)}
+
+    def get_recent_alerts(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return list(self.alerts)[-limit:]
+
+    def _check_entity(self, entity_type, entity_id, stats: EntityStats, transaction,
+                      is_discount: bool, when: datetime, can_alert: bool = True) -> List[Dict[str, Any]]:
+        alerts = []
+        warmed_up = can_alert and stats.change.weight >= Config.ANOMALY_MIN_EVENTS
+
+        # Change given far outside this entity's usual range
+        change = transaction.change_given
+        if warmed_up:
+            z = stats.change.zscore(change)
+            if z >= Config.ANOMALY_Z_THRESHOLD and self._cooled_down(stats, "unusual_change", when):
+                alerts.append(self._alert(
+                    when, "unusual_change", entity_type, entity_id, change, stats.change.mean,
+                    f"Change of ₱{change:.2f} is {z:.1f} standard deviations above usual"
+                ))
+        stats.change.update(change)
+
+        # Discounted fares far above the fleet-wide share
+        stats.discounts.update(is_discount)
+        if warmed_up:
+            expected = self.fleet_discounts.ratio
+            if (stats.discounts.ratio - expected >= Config.ANOMALY_DISCOUNT_MARGIN
+                    and self._cooled_down(stats, "discount_ratio", when)):
+                alerts.append(self._alert(
+                    when, "discount_ratio", entity_type, entity_id, stats.discounts.ratio, expected,
+                    f"Discounted fares at {stats.discounts.ratio:.0%} vs {expected:.0%} fleet-wide"
+                ))
+
+        # Recurring underpayment
+        stats.underpaid.update(transaction.payment_status == "underpaid")
+        if (warmed_up and stats.underpaid.ratio >= Config.ANOMALY_UNDERPAID_RATIO
+                and self._cooled_down(stats, "underpayment", when)):
+            alerts.append(self._alert(
+                when, "underpayment", entity_type, entity_id, stats.underpaid.ratio,
+                Config.ANOMALY_UNDERPAID_RATIO,
+                f"Underpaid fares at {stats.underpaid.ratio:.0%} of recent transactions"
+            ))
+        return alerts
+
+    def _track_revenue(self, route_id: str, when: datetime, amount: float) -> List[Dict[str, Any]]:
+        hour_start = when.replace(minute=0, second=0, microsecond=0)
+        window = self.route_revenue.get(route_id)
+        if window is None:
+            window = self.route_revenue[route_id] = RouteRevenueWindow(hour_start)
+        elif window.hour_start is None:
+            window.hour_start = hour_start
+
+        alerts = []
+        # Close every finished hour (at most a day's worth, so the cost stays bounded)
+        closed = 0
+        while window.hour_start < hour_start and closed < 24:
+            alert = self._check_revenue(route_id, window.hour_start, window.revenue)
+            if alert:
+                alerts.append(alert)
+            window.history[window.hour_start.hour] = window.revenue
+            window.revenue = 0.0
+            window.hour_start += timedelta(hours=1)
+            closed += 1
+        if window.hour_start < hour_start:
+            window.hour_start = hour_start
+
+        window.revenue += amount
+        return alerts
+
+    def _check_revenue(self, route_id: str, hour_start: datetime, revenue: float) -> Optional[Dict[str, Any]]:
+        if self.forecasting_service is None:
+            return None
+        prediction = self.forecasting_service.predict_hour(route_id, hour_start)
+        if prediction is None or prediction["revenue"] < Config.ANOMALY_MIN_EXPECTED_REVENUE:
+            return None
+        expected = prediction["revenue"]
+        if revenue < expected * (1 - Config.ANOMALY_REVENUE_DIP):
+            return self._alert(
+                hour_start, "revenue_dip", "route", route_id, revenue, expected,
+                f"Revenue ₱{revenue:.2f} for {hour_start:%H}:00 vs ₱{expected:.2f} forecast"
+            )
+        return None
+
+    def _cooled_down(self, stats: EntityStats, kind: str, when: datetime) -> bool:
+        last = stats.last_alert.get(kind)
+        if last is not None and when - last < timedelta(minutes=Config.ANOMALY_ALERT_COOLDOWN_MINUTES):
+            return False
+        stats.last_alert[kind] = when
+        return True
+
+    @staticmethod
+    def _alert(when: datetime, kind: str, entity_type: str, entity_id: str,
+               value: float, expected: float, message: str) -> Dict[str, Any]:
+        return {
+            "detected_at": when,
+            "kind": kind,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "value": value,
+            "expected": expected,
+            "message": message
+        }
+
+    def _emit(self, alert: Dict[str, Any]):
+        self.alerts.append(alert)
+        if self.alert_sink:
+            self.alert_sink(alert)
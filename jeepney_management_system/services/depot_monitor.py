@@ -0,0 +1,176 @@
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from config import Config
+from database.queries import JeepneyQueries, TransactionQueries, DATETIME_FORMAT
+from models.transaction import Transaction
+from services.anomaly_detector import AnomalyDetector
+from services.dispatch_scheduler import DispatchScheduler
+from services.forecasting import ForecastingService
+
+
+class DepotMonitor:
+    """Feeds every unit's persisted state to the fleet-wide services
+
+    Each driver process writes its own unit's status, occupancy and
+    transactions; the monitor polls for what changed since its last pass
+    and forwards it as events, so the scheduler and the anomaly detector
+    see the whole fleet. Predicted route load comes from the forecasting
+    service and is refreshed hourly.
+    """
+
+    def __init__(self, jeepney_queries: JeepneyQueries = None,
+                 forecasting_service: ForecastingService = None,
+                 scheduler: DispatchScheduler = None, poll_interval: float = None,
+                 transaction_queries: TransactionQueries = None,
+                 anomaly_detector: AnomalyDetector = None):
+        self.jeepney_queries = jeepney_queries or JeepneyQueries()
+        self.transaction_queries = transaction_queries or TransactionQueries(self.jeepney_queries.db)
+        self.forecasting_service = forecasting_service
+        self.scheduler = scheduler or DispatchScheduler()
+        self.anomaly_detector = anomaly_detector
+        self.poll_interval = Config.MONITOR_POLL_SECONDS if poll_interval is None else poll_interval
+        self.last_seen: Dict[str, str] = {}  # jeepney_id -> updated_at
+        self.since: Optional[str] = None
+        self._predicted_hour = None
+        self._last_expiry = datetime.min
+        self._cursor = None  # (transaction_time, transaction_id) of the last transaction read
+        self._flushed_hour = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def poll_once(self, now: datetime = None):
+        """Forward every unit change since the last pass, then refresh predictions"""
+        now = now or datetime.now()
+        if self.since is None:
+            # Start from today's units; earlier days' units are off duty
+            self.since = now.replace(hour=0, minute=0, second=0, microsecond=0).strftime(DATETIME_FORMAT)
+
+        for row in self.jeepney_queries.get_jeepneys_updated_since(self.since):
+            self._sync_unit(row)
+        # Drivers stamp updated_at before their write commits, so trail the
+        # cursor by the lag; rows inside it are read again, which is harmless
+        horizon = now - timedelta(seconds=Config.MONITOR_TRANSACTION_LAG)
+        self.since = max(self.since, horizon.strftime(DATETIME_FORMAT))
+
+        if self.anomaly_detector is not None:
+            self._read_transactions(now)
+
+        if now - self._last_expiry >= timedelta(minutes=1):
+            self._expire_units(now)
+            self._last_expiry = now
+        self._update_predictions(now)
+
+    def _sync_unit(self, row):
+        # Re-reading an unchanged row is harmless: the scheduler ignores no-op updates
+        jeepney_id = row['jeepney_id']
+        self.last_seen[jeepney_id] = row['updated_at']
+
+        if self.anomaly_detector is not None:
+            self.anomaly_detector.set_unit(jeepney_id, row['driver_name'], row['route_id'])
+
+        new_route = row['route_id'] not in self.scheduler.routes
+        self.scheduler.sync_unit(jeepney_id, row['route_id'], row['capacity'],
+                                 row['status'], row['passengers'])
+        if new_route and self._predicted_hour is not None:
+            self._predict_route(row['route_id'], self._predicted_hour)
+
+    def _read_transactions(self, now: datetime):
+        """Feed every unit's new transactions to the anomaly detector"""
+        detector = self.anomaly_detector
+        catching_up = self._cursor is None
+        # Rows newer than the lag may still have earlier rows committing behind them
+        read_until = now - timedelta(seconds=Config.MONITOR_TRANSACTION_LAG)
+        flush_at = read_until
+        if catching_up:
+            # Seed the fleet baseline from recent history, then replay the
+            # current hour so its revenue is complete; alerts for replayed
+            # transactions were raised by the previous run
+            today = now.strftime("%Y-%m-%d")
+            first_day = (now - timedelta(days=Config.ANOMALY_BASELINE_DAYS)).strftime("%Y-%m-%d")
+            detector.seed_fleet_baseline({
+                row['passenger_type']: row['passengers']
+                for row in self.transaction_queries.get_passenger_type_counts(first_day, today)
+            })
+            replay_start = now.replace(minute=0, second=0, microsecond=0)
+            self._cursor = (replay_start.strftime(DATETIME_FORMAT), "")
+            # Routes without fares yet start their revenue window with the replay, not before it
+            flush_at = max(flush_at, replay_start)
+
+        until = read_until.strftime(DATETIME_FORMAT)
+        while True:
+            rows = self.transaction_queries.get_transactions_after(self._cursor, until)
+            for row in rows:
+                detector.set_unit(row['jeepney_id'], row['driver_name'], row['route_id'])
+                detector.observe(_transaction_from_row(row), emit=not catching_up)
+            if rows:
+                self._cursor = (rows[-1]['transaction_time'], rows[-1]['transaction_id'])
+            if len(rows) < Config.DB_FETCH_SIZE:
+                break
+
+        # Close finished hours on quiet routes too, so revenue dips are still caught
+        hour = flush_at.replace(minute=0, second=0, microsecond=0)
+        if hour != self._flushed_hour:
+            detector.flush(flush_at)
+            self._flushed_hour = hour
+
+    def _expire_units(self, now: datetime):
+        """Treat units that stopped reporting as off duty"""
+        cutoff = (now - timedelta(minutes=Config.MONITOR_UNIT_TIMEOUT_MINUTES)).strftime(DATETIME_FORMAT)
+        for jeepney_id, updated_at in list(self.last_seen.items()):
+            if updated_at < cutoff:
+                self.scheduler.update_status(jeepney_id, "inactive")
+                del self.last_seen[jeepney_id]
+
+    def _update_predictions(self, now: datetime):
+        hour = now.replace(minute=0, second=0, microsecond=0)
+        if hour == self._predicted_hour or self.forecasting_service is None:
+            return
+        self._predicted_hour = hour
+        for route_id in list(self.scheduler.routes):
+            self._predict_route(route_id, hour)
+
+    def _predict_route(self, route_id: str, hour: datetime):
+        if self.forecasting_service is None:
+            return
+        prediction = self.forecasting_service.predict_hour(route_id, hour)
+        if prediction is not None:
+            # Boardings per hour times the average ride gives passengers on board
+            load = prediction["passengers"] * Config.DISPATCH_AVERAGE_RIDE_MINUTES / 60
+            self.scheduler.set_predicted_load(route_id, load)
+
+    def run(self):
+        """Poll until stop() is called"""
+        self._stop.clear()
+        while True:
+            self.poll_once()
+            if self._stop.wait(self.poll_interval):
+                break
+
+    def start(self):
+        """Run the monitor from a background thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, name="depot-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _transaction_from_row(row) -> Transaction:
+    return Transaction(
+        transaction_id=row['transaction_id'],
+        jeepney_id=row['jeepney_id'],
+        passenger_type=row['passenger_type'],
+        required_fare=row['required_fare'],
+        amount_paid=row['amount_paid'],
+        change_given=row['change_given'],
+        payment_status=row['payment_status'],
+        boarding_location=row['boarding_location'],
+        destination=row['destination'],
+        transaction_time=datetime.strptime(row['transaction_time'], DATETIME_FORMAT)
+    )
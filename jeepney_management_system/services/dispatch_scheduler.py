@@ -0,0 +1,319 @@
+import heapq
+from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Callable
+from config import Config
+from utils.constants import JEEPNEY_STATUSES
+
+
+@dataclass
+class UnitState:
+    """Live state of a single jeepney as seen by the scheduler"""
+    jeepney_id: str
+    route_id: str
+    capacity: int
+    passengers: int = 0
+    status: str = "active"
+    version: int = 0  # bumped on every change; older heap entries are stale
+
+
+@dataclass
+class RouteLoad:
+    """Running totals for one route, updated on every unit event"""
+    route_id: str
+    active_units: int = 0
+    seats: int = 0
+    passengers: int = 0
+    predicted_load: float = 0.0
+    version: int = 0
+
+    @property
+    def pressure(self) -> float:
+        """Load (observed or predicted, whichever is higher) per available seat"""
+        load = max(self.passengers, self.predicted_load)
+        if self.seats == 0:
+            return float("inf") if load > 0 else 0.0
+        return load / self.seats
+
+    @property
+    def headway_minutes(self) -> Optional[float]:
+        if self.active_units == 0:
+            return None
+        return Config.ROUTE_CYCLE_MINUTES / self.active_units
+
+
+class DispatchScheduler:
+    """Suggests unit dispatch and headway changes from live route load
+
+    Routes sit in two lazily invalidated heaps keyed by pressure: the
+    busiest route is the dispatch target and the quietest route with a
+    spare unit is the donor. Each route also keeps a heap of its active
+    units by occupancy, so the emptiest donor unit is found without a
+    scan. Every event touches only the unit involved and its routes, so
+    its cost is O(log routes + log units on the route).
+    """
+
+    def __init__(self):
+        self.units: Dict[str, UnitState] = {}
+        self.routes: Dict[str, RouteLoad] = {}
+        self.route_units: Dict[str, set] = {}
+        self._unit_heaps: Dict[str, list] = {}  # route -> (passengers, version, jeepney_id)
+        self._busiest = []   # (-pressure, version, route_id)
+        self._quietest = []  # (pressure, version, route_id)
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._last_suggestion = None
+
+    # Events
+
+    def observe(self, jeepney):
+        """Register a jeepney or sync its route, status and occupancy"""
+        self.sync_unit(jeepney.jeepney_id, jeepney.route_id, jeepney.capacity,
+                       jeepney.status, jeepney.get_current_occupancy())
+
+    def sync_unit(self, jeepney_id: str, route_id: str, capacity: int, status: str, passengers: int):
+        """Register a unit or apply whatever changed in its reported state"""
+        unit = self.units.get(jeepney_id)
+        if unit is None:
+            self._add_unit(UnitState(
+                jeepney_id=jeepney_id,
+                route_id=route_id,
+                capacity=capacity,
+                passengers=passengers,
+                status=status
+            ))
+            return
+        if unit.route_id != route_id:
+            self.reassign_unit(jeepney_id, route_id)
+        self.update_status(jeepney_id, status)
+        self.update_occupancy(jeepney_id, passengers)
+
+    def update_status(self, jeepney_id: str, status: str):
+        """Unit went active, into maintenance, or out of service"""
+        if status not in JEEPNEY_STATUSES:
+            raise ValueError(f"Invalid jeepney status: {status}")
+        unit = self._get_unit(jeepney_id)
+        if unit.status == status:
+            return
+        self._detach(unit)
+        unit.status = status
+        self._attach(unit)
+        self._touch(unit.route_id)
+        # Going to or from "active" changes the route's unit count
+        self._notify([unit.route_id])
+
+    def update_occupancy(self, jeepney_id: str, passengers: int):
+        """Unit reported its current number of passengers"""
+        unit = self._get_unit(jeepney_id)
+        if unit.passengers == passengers:
+            return
+        if unit.status == "active":
+            self.routes[unit.route_id].passengers += passengers - unit.passengers
+        unit.passengers = passengers
+        self._queue_unit(unit)
+        self._touch(unit.route_id)
+        self._notify()
+
+    def record_boarding(self, jeepney_id: str):
+        self.update_occupancy(jeepney_id, self._get_unit(jeepney_id).passengers + 1)
+
+    def record_alighting(self, jeepney_id: str):
+        unit = self._get_unit(jeepney_id)
+        self.update_occupancy(jeepney_id, max(0, unit.passengers - 1))
+
+    def set_predicted_load(self, route_id: str, load: float):
+        """Expected passengers on board across the route, e.g. from ForecastingService"""
+        route = self._get_route(route_id)
+        route.predicted_load = load
+        self._touch(route_id)
+        self._notify()
+
+    def reassign_unit(self, jeepney_id: str, route_id: str):
+        """Move a unit to another route"""
+        unit = self._get_unit(jeepney_id)
+        if unit.route_id == route_id:
+            return
+        old_route = unit.route_id
+        self._detach(unit)
+        self.route_units[old_route].discard(jeepney_id)
+        unit.route_id = route_id
+        self._get_route(route_id)
+        self.route_units[route_id].add(jeepney_id)
+        self._attach(unit)
+        self._touch(old_route)
+        self._touch(route_id)
+        self._notify([old_route, route_id] if unit.status == "active" else [])
+
+    # Suggestions
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Receive headway changes and new dispatch suggestions as events produce them"""
+        self._listeners.append(callback)
+
+    def suggest_dispatch(self) -> Optional[Dict[str, Any]]:
+        """Suggest moving one unit from the quietest route to the busiest one"""
+        target = self._peek(self._busiest)
+        if target is None or target.pressure < Config.DISPATCH_PRESSURE_THRESHOLD:
+            return None
+
+        donor = self._peek(self._quietest, exclude=target.route_id)
+        if donor is None or target.pressure - donor.pressure < Config.DISPATCH_PRESSURE_GAP:
+            return None
+
+        jeepney_id = self._peek_unit(donor.route_id)
+        if jeepney_id is None:
+            return None
+        return {
+            "action": "dispatch",
+            "jeepney_id": jeepney_id,
+            "from_route": donor.route_id,
+            "to_route": target.route_id,
+            "from_pressure": donor.pressure,
+            "to_pressure": target.pressure
+        }
+
+    def apply_dispatch(self, suggestion: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Carry out a dispatch suggestion and return the resulting headway changes"""
+        self.reassign_unit(suggestion["jeepney_id"], suggestion["to_route"])
+        return [self.get_headway(suggestion["from_route"]),
+                self.get_headway(suggestion["to_route"])]
+
+    def get_headway(self, route_id: str) -> Dict[str, Any]:
+        route = self._get_route(route_id)
+        return {
+            "action": "headway",
+            "route_id": route_id,
+            "active_units": route.active_units,
+            "headway_minutes": route.headway_minutes
+        }
+
+    def get_route_loads(self) -> List[Dict[str, Any]]:
+        """All routes, busiest first"""
+        loads = [{
+            "route_id": r.route_id,
+            "active_units": r.active_units,
+            "seats": r.seats,
+            "passengers": r.passengers,
+            "predicted_load": r.predicted_load,
+            "pressure": r.pressure
+        } for r in self.routes.values()]
+        return sorted(loads, key=lambda x: x["pressure"], reverse=True)
+
+    # Internal bookkeeping
+
+    def _get_unit(self, jeepney_id: str) -> UnitState:
+        if jeepney_id not in self.units:
+            raise ValueError(f"Unknown jeepney: {jeepney_id}")
+        return self.units[jeepney_id]
+
+    def _get_route(self, route_id: str) -> RouteLoad:
+        if route_id not in self.routes:
+            self.routes[route_id] = RouteLoad(route_id)
+            self.route_units[route_id] = set()
+            self._unit_heaps[route_id] = []
+        return self.routes[route_id]
+
+    def _add_unit(self, unit: UnitState):
+        if unit.status not in JEEPNEY_STATUSES:
+            raise ValueError(f"Invalid jeepney status: {unit.status}")
+        self.units[unit.jeepney_id] = unit
+        self._get_route(unit.route_id)
+        self.route_units[unit.route_id].add(unit.jeepney_id)
+        self._attach(unit)
+        self._touch(unit.route_id)
+        self._notify([unit.route_id] if unit.status == "active" else [])
+
+    def _attach(self, unit: UnitState):
+        if unit.status == "active":
+            route = self.routes[unit.route_id]
+            route.active_units += 1
+            route.seats += unit.capacity
+            route.passengers += unit.passengers
+        self._queue_unit(unit)
+
+    def _detach(self, unit: UnitState):
+        if unit.status == "active":
+            route = self.routes[unit.route_id]
+            route.active_units -= 1
+            route.seats -= unit.capacity
+            route.passengers -= unit.passengers
+        unit.version += 1  # drops the unit's entry from its route's heap
+
+    def _queue_unit(self, unit: UnitState):
+        """(Re-)queue an active unit on its route's heap after it changed"""
+        unit.version += 1
+        if unit.status != "active":
+            return
+        heap = self._unit_heaps[unit.route_id]
+        heapq.heappush(heap, (unit.passengers, unit.version, unit.jeepney_id))
+        if len(heap) > 4 * len(self.route_units[unit.route_id]) + 16:
+            heap[:] = [(self.units[j].passengers, self.units[j].version, j)
+                       for j in self.route_units[unit.route_id] if self.units[j].status == "active"]
+            heapq.heapify(heap)
+
+    def _peek_unit(self, route_id: str) -> Optional[str]:
+        """The emptiest active unit on a route, discarding stale entries"""
+        heap = self._unit_heaps[route_id]
+        while heap:
+            passengers, version, jeepney_id = heap[0]
+            unit = self.units[jeepney_id]
+            if unit.version == version and unit.route_id == route_id and unit.status == "active":
+                return jeepney_id
+            heapq.heappop(heap)
+        return None
+
+    def _touch(self, route_id: str):
+        """Re-queue a route after its totals changed"""
+        route = self.routes[route_id]
+        route.version += 1
+        pressure = route.pressure
+        heapq.heappush(self._busiest, (-pressure, route.version, route_id))
+        if route.active_units > Config.DISPATCH_MIN_UNITS_PER_ROUTE:
+            heapq.heappush(self._quietest, (pressure, route.version, route_id))
+
+        # Stale entries are dropped lazily; rebuild if they pile up
+        if len(self._busiest) > 4 * len(self.routes) + 64:
+            self._rebuild_heaps()
+
+    def _notify(self, headway_routes: List[str] = ()):
+        """Emit headway changes for routes whose unit count changed, then any new suggestion"""
+        if not self._listeners:
+            return
+        for route_id in headway_routes:
+            headway = self.get_headway(route_id)
+            for callback in self._listeners:
+                callback(headway)
+
+        suggestion = self.suggest_dispatch()
+        key = suggestion and (suggestion["jeepney_id"], suggestion["to_route"])
+        if suggestion and key != self._last_suggestion:
+            for callback in self._listeners:
+                callback(suggestion)
+        self._last_suggestion = key
+
+    def _rebuild_heaps(self):
+        self._busiest = [(-r.pressure, r.version, r.route_id) for r in self.routes.values()]
+        self._quietest = [(r.pressure, r.version, r.route_id) for r in self.routes.values()
+                          if r.active_units > Config.DISPATCH_MIN_UNITS_PER_ROUTE]
+        heapq.heapify(self._busiest)
+        heapq.heapify(self._quietest)
+
+    def _is_current(self, entry) -> bool:
+        route = self.routes[entry[2]]
+        return entry[1] == route.version
+
+    def _peek(self, heap, exclude: str = None) -> Optional[RouteLoad]:
+        """Return the top current route of a heap, discarding stale entries"""
+        skipped = []
+        found = None
+        while heap:
+            entry = heap[0]
+            if not self._is_current(entry):
+                heapq.heappop(heap)
+                continue
+            if entry[2] == exclude:
+                skipped.append(heapq.heappop(heap))
+                continue
+            found = self.routes[entry[2]]
+            break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return found
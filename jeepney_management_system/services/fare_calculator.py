@@ -1,28 +1,41 @@
-from config import Config
 from typing import Optional
+from utils.config_registry import get_registry
+from utils.metrics import timed, counter
+
+payments_rejected = counter("fare_payments_rejected_total", "Payments rejected by validate_payment")
 
 
 class FareCalculator:
     # Handles fare calculations and validations
     
     def __init__(self):
-        self.base_fares = Config.BASE_FARES
+        self.registry = get_registry()
+    
+    @property
+    def base_fares(self):
+        # Current fare table; follows hot reloads of the fares file
+        return self.registry.current().fares
     
+    @timed("fare_calculate_seconds")
     def calculate_fare(self, passenger_type: str) -> float:
         # Calculates fares based on passenger type
         
-        if passenger_type not in self.base_fares:
+        fares = self.registry.current().fares
+        if passenger_type not in fares:
             raise ValueError(f"Invalid passenger type: {passenger_type}")
         
-        return self.base_fares[passenger_type]
+        return fares[passenger_type]
     
+    @timed("fare_validate_payment_seconds")
     def validate_payment(self, required_fare: float, amount_paid: float) -> dict:
         # Validate payment and calculate change
         
         if amount_paid < 0:
+            payments_rejected.inc()
             return {"valid": False, "error": "Invalid amount"}
         
         if amount_paid < required_fare:
+            payments_rejected.inc()
             shortage = required_fare - amount_paid
             return {
                 "valid": False, 
@@ -0,0 +1,231 @@
+from typing import List, Dict, Any, Optional
+from datetime import datetime, timedelta
+from collections import defaultdict
+from config import Config
+from database.queries import TransactionQueries, ForecastQueries
+
+HOURS_PER_WEEK = 168
+
+
+class SeasonalModel:
+    """Additive exponential smoothing with one seasonal slot per hour of the week"""
+
+    def __init__(self, alpha: float, gamma: float):
+        self.alpha = alpha
+        self.gamma = gamma
+        self.level = 0.0
+        self.seasonal = [0.0] * HOURS_PER_WEEK
+        self.seen = [False] * HOURS_PER_WEEK
+        self.observations = 0
+
+    def update(self, slot: int, value: float):
+        """Fold one hourly observation into the model"""
+        if self.observations == 0:
+            self.level = value
+        if not self.seen[slot]:
+            # First time we see this hour of the week: seed its seasonal offset
+            self.seasonal[slot] = value - self.level
+            self.seen[slot] = True
+        else:
+            previous_level = self.level
+            self.level = (self.alpha * (value - self.seasonal[slot])
+                          + (1 - self.alpha) * previous_level)
+            self.seasonal[slot] = (self.gamma * (value - self.level)
+                                   + (1 - self.gamma) * self.seasonal[slot])
+        self.observations += 1
+
+    def predict(self, slot: int) -> float:
+        """Forecast the value for an hour-of-week slot"""
+        if not self.seen[slot]:
+            return max(0.0, self.level)
+        return max(0.0, self.level + self.seasonal[slot])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "level": self.level,
+            "seasonal": self.seasonal,
+            "seen": self.seen,
+            "observations": self.observations
+        }
+
+    def load_dict(self, state: Dict[str, Any]):
+        self.level = state["level"]
+        self.seasonal = list(state["seasonal"])
+        self.seen = list(state["seen"])
+        self.observations = state["observations"]
+
+
+class RouteDemandModel:
+    """Passenger and revenue models for a single route"""
+
+    def __init__(self, route_id: str, alpha: float, gamma: float):
+        self.route_id = route_id
+        self.passengers = SeasonalModel(alpha, gamma)
+        self.revenue = SeasonalModel(alpha, gamma)
+
+    def update(self, slot: int, passengers: float, revenue: float):
+        self.passengers.update(slot, passengers)
+        self.revenue.update(slot, revenue)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"passengers": self.passengers.to_dict(), "revenue": self.revenue.to_dict()}
+
+    def load_dict(self, state: Dict[str, Any]):
+        self.passengers.load_dict(state["passengers"])
+        self.revenue.load_dict(state["revenue"])
+
+
+class ForecastingService:
+    """Forecasts route demand and revenue from hourly transaction rollups
+
+    Models are updated one closed day at a time, so keeping them current
+    never requires another pass over the full history. Forecasts are
+    cached until the next day is closed. With forecast_queries the model
+    state is saved after every closed day and reloaded on start, so a new
+    process only folds in the days closed since the last save.
+    """
+
+    def __init__(self, transaction_queries: TransactionQueries = None,
+                 alpha: float = None, gamma: float = None,
+                 forecast_queries: ForecastQueries = None):
+        self.transaction_queries = transaction_queries or TransactionQueries()
+        self.forecast_queries = forecast_queries
+        self.alpha = Config.FORECAST_ALPHA if alpha is None else alpha
+        self.gamma = Config.FORECAST_GAMMA if gamma is None else gamma
+        self.models: Dict[str, RouteDemandModel] = {}
+        self.last_closed_date: Optional[datetime] = None
+        self._forecast_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _slot(day: datetime, hour: int) -> int:
+        return day.weekday() * 24 + hour
+
+    def warm_up(self, end_date: str, days: int = None):
+        """Fit models from recent history, ending with (and closing) end_date"""
+        days = Config.FORECAST_HISTORY_DAYS if days is None else days
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        self.last_closed_date = end - timedelta(days=days)
+        self.close_day(end_date)
+
+    def load(self) -> bool:
+        """Restore the saved model state; returns False if nothing was saved"""
+        if self.forecast_queries is None:
+            return False
+        closed_through, states = self.forecast_queries.load_models()
+        if closed_through is None:
+            return False
+        self.models = {}
+        for route_id, state in states.items():
+            model = RouteDemandModel(route_id, self.alpha, self.gamma)
+            model.load_dict(state)
+            self.models[route_id] = model
+        self.last_closed_date = datetime.strptime(closed_through, "%Y-%m-%d")
+        self._forecast_cache.clear()
+        return True
+
+    def save(self):
+        if self.forecast_queries is None or self.last_closed_date is None:
+            return
+        self.forecast_queries.save_models(
+            self.last_closed_date.strftime("%Y-%m-%d"),
+            {route_id: model.to_dict() for route_id, model in self.models.items()}
+        )
+
+    def refresh(self, date: str):
+        """Bring the models up to date through date, from saved state when there is one
+
+        Only days that have ended are closed: a day still in progress would
+        fold its remaining hours in as zero demand, and a closed day is
+        never revisited.
+        """
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d")
+        date = min(date, yesterday)
+        if self.last_closed_date is None and not self.load():
+            self.warm_up(date)
+        else:
+            self.close_day(date)
+
+    def close_day(self, date: str):
+        """Fold a closed day (and any skipped days before it) into the models"""
+        day = datetime.strptime(date, "%Y-%m-%d")
+        if self.last_closed_date is not None and day <= self.last_closed_date:
+            print(f"⚠️ Forecasts already closed through {self.last_closed_date:%Y-%m-%d}; "
+                  f"not folding in {date} again")
+            return
+
+        first_day = day if self.last_closed_date is None else self.last_closed_date + timedelta(days=1)
+        rows = self.transaction_queries.get_hourly_rollups(
+            first_day.strftime("%Y-%m-%d"), date
+        )
+
+        # day -> route -> hour -> (passengers, revenue)
+        rollups = defaultdict(lambda: defaultdict(dict))
+        for row in rows:
+            rollups[row['day']][row['route_id']][row['hour']] = (row['passengers'], row['revenue'] or 0.0)
+            if row['route_id'] not in self.models:
+                self.models[row['route_id']] = RouteDemandModel(row['route_id'], self.alpha, self.gamma)
+
+        current = first_day
+        while current <= day:
+            day_rollups = rollups.get(current.strftime("%Y-%m-%d"), {})
+            for route_id, model in self.models.items():
+                hours = day_rollups.get(route_id, {})
+                for hour in range(24):
+                    passengers, revenue = hours.get(hour, (0, 0.0))
+                    model.update(self._slot(current, hour), passengers, revenue)
+            current += timedelta(days=1)
+
+        self.last_closed_date = day
+        self._forecast_cache.clear()
+        self.save()
+
+    def forecast_route(self, route_id: str, hours: int = HOURS_PER_WEEK) -> List[Dict[str, Any]]:
+        """Hourly forecast for a route, starting the day after the last closed day"""
+        key = (route_id, hours)
+        if key not in self._forecast_cache:
+            self._forecast_cache[key] = self._build_forecast(route_id, hours)
+        # Copies, so callers can't alter the cached forecast
+        return [dict(entry) for entry in self._forecast_cache[key]]
+
+    def _build_forecast(self, route_id: str, hours: int) -> tuple:
+        model = self.models.get(route_id)
+        if model is None or self.last_closed_date is None:
+            return ()
+
+        start = self.last_closed_date + timedelta(days=1)
+        forecast = []
+        for offset in range(hours):
+            moment = start + timedelta(hours=offset)
+            slot = self._slot(moment, moment.hour)
+            forecast.append({
+                "time": moment.strftime("%Y-%m-%d %H:00"),
+                "passengers": model.passengers.predict(slot),
+                "revenue": model.revenue.predict(slot)
+            })
+
+        return tuple(forecast)
+
+    def predict_hour(self, route_id: str, moment: datetime) -> Optional[Dict[str, float]]:
+        """Forecast passengers and revenue for the hour containing moment"""
+        model = self.models.get(route_id)
+        if model is None:
+            return None
+        slot = self._slot(moment, moment.hour)
+        return {
+            "passengers": model.passengers.predict(slot),
+            "revenue": model.revenue.predict(slot)
+        }
+
+    def forecast_all(self, hours: int = HOURS_PER_WEEK) -> Dict[str, List[Dict[str, Any]]]:
+        """Hourly forecasts for every known route"""
+        return {route_id: self.forecast_route(route_id, hours) for route_id in self.models}
+
+    def get_route_forecast_summary(self, route_id: str, hours: int = HOURS_PER_WEEK) -> Dict[str, Any]:
+        """Total predicted passengers and revenue for a route over the horizon"""
+        forecast = self.forecast_route(route_id, hours)
+        return {
+            "route_id": route_id,
+            "hours": hours,
+            "predicted_passengers": sum(f["passengers"] for f in forecast),
+            "predicted_revenue": sum(f["revenue"] for f in forecast)
+        }
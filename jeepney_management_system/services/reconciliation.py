@@ -0,0 +1,104 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any
+from config import Config
+from database.connection import DatabaseManager
+from database.queries import ReconciliationQueries
+
+
+def reconcile_units(database_url: str, date: str, jeepney_ids: List[str],
+                    turnins: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Reconcile a chunk of units (runs inside a worker process)"""
+    queries = ReconciliationQueries(DatabaseManager(database_url))
+    persisted = {row['jeepney_id']: row for row in queries.get_unit_totals(date, jeepney_ids)}
+    return [_reconcile_unit(jeepney_id, persisted.get(jeepney_id), turnins.get(jeepney_id))
+            for jeepney_id in jeepney_ids]
+
+
+def _reconcile_unit(jeepney_id: str, persisted, turnin) -> Dict[str, Any]:
+    """Compare persisted totals with what the unit reported and the cash handed in"""
+    passengers = persisted['passengers'] if persisted else 0
+    revenue = (persisted['revenue'] or 0.0) if persisted else 0.0
+    change = (persisted['change_total'] or 0.0) if persisted else 0.0
+    exact_payments = persisted['exact_payments'] if persisted else 0
+    net_revenue = revenue - change
+
+    result = {
+        "jeepney_id": jeepney_id,
+        "passengers": passengers,
+        "revenue": revenue,
+        "change": change,
+        "net_revenue": net_revenue,
+        "payment_efficiency": (exact_payments / passengers) * 100 if passengers > 0 else 0,
+        "cash_turned_in": None,
+        "cash_difference": None,
+        "unsaved_passengers": None,
+        "unsaved_revenue": None,
+        "status": "ok"
+    }
+
+    if turnin is None:
+        result["status"] = "missing_turnin"
+        return result
+
+    result["cash_turned_in"] = turnin["cash_turned_in"]
+    result["cash_difference"] = turnin["cash_turned_in"] - net_revenue
+    # What the unit recorded during the day but never reached the database
+    result["unsaved_passengers"] = turnin["reported_passengers"] - passengers
+    result["unsaved_revenue"] = turnin["reported_revenue"] - revenue
+
+    if persisted is None:
+        result["status"] = "no_transactions"
+    elif (abs(result["cash_difference"]) > Config.RECONCILE_TOLERANCE
+          or abs(result["unsaved_revenue"]) > Config.RECONCILE_TOLERANCE
+          or result["unsaved_passengers"] != 0):
+        result["status"] = "discrepancy"
+    return result
+
+
+class ReconciliationService:
+    """Closes a day by reconciling every unit's cash, reported and persisted totals
+
+    Units are split into chunks and each chunk is aggregated with a single
+    grouped query inside a worker process, so closing the depot takes a
+    handful of queries rather than a pass per driver.
+    """
+
+    def __init__(self, database_url: str = None, workers: int = None):
+        self.database_url = database_url or Config.DATABASE_URL
+        self.workers = workers or Config.RECONCILE_WORKERS
+        self.queries = ReconciliationQueries(DatabaseManager(self.database_url))
+
+    def reconcile_day(self, date: str) -> List[Dict[str, Any]]:
+        """Reconcile every unit that either transacted or turned in cash on date"""
+        turnins = {row['jeepney_id']: dict(row) for row in self.queries.get_turnins_by_date(date)}
+        jeepney_ids = sorted(set(self.queries.get_active_unit_ids(date)) | set(turnins))
+        if not jeepney_ids:
+            return []
+
+        size = Config.RECONCILE_CHUNK_SIZE
+        chunks = [jeepney_ids[i:i + size] for i in range(0, len(jeepney_ids), size)]
+        jobs = [(self.database_url, date, chunk, {j: turnins[j] for j in chunk if j in turnins})
+                for chunk in chunks]
+
+        results = []
+        if self.workers == 1 or len(chunks) == 1:
+            for job in jobs:
+                results.extend(reconcile_units(*job))
+        else:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(chunks))) as pool:
+                for chunk_results in pool.map(reconcile_units, *zip(*jobs)):
+                    results.extend(chunk_results)
+        return results
+
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Depot-wide totals for a reconciled day"""
+        statuses = {}
+        for result in results:
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        return {
+            "units": len(results),
+            "net_revenue": sum(r["net_revenue"] for r in results),
+            "cash_turned_in": sum(r["cash_turned_in"] or 0 for r in results),
+            "status_breakdown": statuses
+        }
@@ -0,0 +1,33 @@
+import os
+import csv
+from typing import List, Dict, Any
+from config import Config
+
+
+class ReportGenerator:
+    """Writes operational reports to the reports directory"""
+    
+    DISCREPANCY_COLUMNS = [
+        "jeepney_id", "status", "passengers", "revenue", "change", "net_revenue",
+        "payment_efficiency", "cash_turned_in", "cash_difference",
+        "unsaved_passengers", "unsaved_revenue"
+    ]
+    
+    def __init__(self, reports_dir: str = None):
+        self.reports_dir = reports_dir or Config.REPORTS_DIR
+    
+    def write_discrepancy_report(self, date: str, results: List[Dict[str, Any]]) -> str:
+        """Write the end-of-day reconciliation as CSV, discrepancies first"""
+        os.makedirs(self.reports_dir, exist_ok=True)
+        path = os.path.join(self.reports_dir, f"reconciliation_{date}.csv")
+        
+        ordered = sorted(results, key=lambda r: (r["status"] == "ok", r["jeepney_id"]))
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=self.DISCREPANCY_COLUMNS, extrasaction="ignore")
+            writer.writeheader()
+            for result in ordered:
+                writer.writerow({
+                    key: round(value, 2) if isinstance(value, float) else value
+                    for key, value in result.items()
+                })
+        return path
@@ -0,0 +1,284 @@
+import time
+import random
+import threading
+from array import array
+from typing import List, Dict, Any, Optional, Callable, Iterator, NamedTuple
+from config import Config
+from database.queries import SensorQueries
+
+
+class SeatSensorEvent(NamedTuple):
+    """One raw reading from a seat sensor"""
+    jeepney_id: str
+    seat: int
+    occupied: bool
+    timestamp: float  # seconds since epoch
+
+
+class SeatSensorSimulator:
+    """Generates noisy seat-sensor readings for local testing"""
+
+    def __init__(self, jeepney_id: str, capacity: int = Config.MAX_PASSENGERS,
+                 report_interval: float = 0.5, flicker_rate: float = 0.05, seed: int = None):
+        self.jeepney_id = jeepney_id
+        self.capacity = capacity
+        self.report_interval = report_interval
+        self.flicker_rate = flicker_rate
+        self.random = random.Random(seed)
+
+    def events(self, start: float, duration: float,
+               occupied_seats: Callable[[float], int]) -> Iterator[SeatSensorEvent]:
+        """Yield every seat's reading each report interval
+
+        occupied_seats(t) gives the true number of occupied seats at time t;
+        each reading is flipped with probability flicker_rate to mimic
+        passengers shifting around and sensor noise.
+        """
+        steps = int(duration / self.report_interval)
+        for step in range(steps):
+            now = start + step * self.report_interval
+            yield from self.readings(now, occupied_seats(now))
+
+    def readings(self, now: float, occupied: int) -> Iterator[SeatSensorEvent]:
+        """One reading from every seat at time now, with occupied seats filled"""
+        for seat in range(self.capacity):
+            reading = seat < occupied
+            if self.random.random() < self.flicker_rate:
+                reading = not reading
+            yield SeatSensorEvent(self.jeepney_id, seat, reading, now)
+
+
+class UnitSensorState:
+    """Debounced seat states and a ring of occupancy samples for one unit"""
+
+    def __init__(self, jeepney_id: str, capacity: int, start: float):
+        self.jeepney_id = jeepney_id
+        self.capacity = capacity
+        self.stable = bytearray(capacity)         # debounced seat state
+        self.pending = bytearray(capacity)        # raw state waiting to settle
+        self.pending_since = array('d', [0.0] * capacity)  # 0 = nothing pending
+        self.sensed = 0
+
+        ring_size = int(Config.SENSOR_SEGMENT_SECONDS / Config.SENSOR_SAMPLE_SECONDS) + 1
+        self.samples = array('B', [0] * ring_size)       # sensed occupancy
+        self.fare_samples = array('B', [0] * ring_size)  # fare-based occupancy at the same ticks
+        self.head = 0
+        self.sample_count = 0   # samples taken in the current segment
+        self.next_sample = start
+        self.segment_start = start
+
+    def debounce(self, seat: int, occupied: bool, timestamp: float):
+        """Accept a seat change only after it holds for the debounce period"""
+        value = 1 if occupied else 0
+        if value == self.stable[seat]:
+            self.pending_since[seat] = 0.0
+            return
+        if self.pending_since[seat] == 0.0 or self.pending[seat] != value:
+            self.pending[seat] = value
+            self.pending_since[seat] = timestamp
+        elif timestamp - self.pending_since[seat] >= Config.SENSOR_DEBOUNCE_SECONDS:
+            self._commit(seat, value)
+
+    def settle(self, timestamp: float):
+        """Commit pending changes whose debounce period has passed without contradiction"""
+        for seat in range(self.capacity):
+            since = self.pending_since[seat]
+            if since and timestamp - since >= Config.SENSOR_DEBOUNCE_SECONDS:
+                self._commit(seat, self.pending[seat])
+
+    def _commit(self, seat: int, value: int):
+        self.stable[seat] = value
+        self.pending_since[seat] = 0.0
+        self.sensed += 1 if value else -1
+
+    def sample_until(self, timestamp: float, fare_occupancy: int):
+        """Record sensed and fare-based occupancy once per sample interval up to timestamp"""
+        if self.next_sample > timestamp:
+            return
+        steps = int((timestamp - self.next_sample) / Config.SENSOR_SAMPLE_SECONDS) + 1
+        size = len(self.samples)
+        fare_occupancy = min(fare_occupancy, 255)
+        # After a long silence the ring only needs to be filled once
+        for _ in range(min(steps, size)):
+            self.samples[self.head] = self.sensed
+            self.fare_samples[self.head] = fare_occupancy
+            self.head = (self.head + 1) % size
+        self.sample_count = min(self.sample_count + steps, size)
+        self.next_sample += steps * Config.SENSOR_SAMPLE_SECONDS
+
+    def segment_samples(self, ring: array = None) -> List[int]:
+        """Samples taken since the segment started, oldest first"""
+        ring = self.samples if ring is None else ring
+        size = len(ring)
+        return [ring[(self.head - self.sample_count + i) % size] for i in range(self.sample_count)]
+
+
+class SeatOccupancyPipeline:
+    """Debounces raw seat-sensor events and reconciles them with fare counts
+
+    Raw events only touch fixed-size per-unit buffers. A trip segment runs
+    from one stop (a recorded boarding or alighting) to the next, or until
+    it reaches SENSOR_SEGMENT_SECONDS, and only the aggregated segment is
+    kept and persisted.
+    """
+
+    def __init__(self, sensor_queries: SensorQueries = None):
+        self.sensor_queries = sensor_queries
+        self.units: Dict[str, UnitSensorState] = {}
+        self.jeepneys: Dict[str, Any] = {}
+        self.reconciliation: Dict[str, Dict[str, float]] = {}
+        self._unsaved: List[Dict[str, Any]] = []
+
+    def register_unit(self, jeepney, start: float):
+        """Start tracking a jeepney's seat sensors from the given time"""
+        self.jeepneys[jeepney.jeepney_id] = jeepney
+        self.units[jeepney.jeepney_id] = UnitSensorState(jeepney.jeepney_id, jeepney.capacity, start)
+        self.reconciliation[jeepney.jeepney_id] = {
+            "segments": 0, "total_discrepancy": 0.0, "max_discrepancy": 0.0, "flagged_segments": 0
+        }
+
+    def ingest(self, event: SeatSensorEvent) -> Optional[Dict[str, Any]]:
+        """Feed one raw event; returns the closed segment if this event ended one"""
+        unit = self.units.get(event.jeepney_id)
+        if unit is None or not 0 <= event.seat < unit.capacity:
+            return None
+
+        if unit.next_sample <= event.timestamp:
+            unit.sample_until(event.timestamp, self.jeepneys[event.jeepney_id].get_current_occupancy())
+        unit.debounce(event.seat, event.occupied, event.timestamp)
+
+        if event.timestamp - unit.segment_start >= Config.SENSOR_SEGMENT_SECONDS:
+            return self.close_segment(event.jeepney_id, event.timestamp)
+        return None
+
+    def ingest_many(self, events) -> List[Dict[str, Any]]:
+        segments = []
+        for event in events:
+            segment = self.ingest(event)
+            if segment:
+                segments.append(segment)
+        return segments
+
+    def record_stop(self, jeepney_id: str, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Close the ride since the previous stop; call before the boarding or alighting is applied
+
+        Boardings and alightings within SENSOR_MIN_SEGMENT_SECONDS of the
+        segment start belong to the same stop and keep it open.
+        """
+        unit = self.units.get(jeepney_id)
+        if unit is None or timestamp - unit.segment_start < Config.SENSOR_MIN_SEGMENT_SECONDS:
+            return None
+        return self.close_segment(jeepney_id, timestamp)
+
+    def close_segment(self, jeepney_id: str, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Close the current trip segment and reconcile it"""
+        unit = self.units[jeepney_id]
+        unit.settle(timestamp)
+        unit.sample_until(timestamp, self.jeepneys[jeepney_id].get_current_occupancy())
+        samples = unit.segment_samples()
+        if not samples:
+            return None
+
+        # Both averages cover the same sample ticks, so boardings mid-segment
+        # show up on both sides instead of as a discrepancy
+        sensed_avg = sum(samples) / len(samples)
+        fare_avg = sum(unit.segment_samples(unit.fare_samples)) / len(samples)
+        discrepancy = sensed_avg - fare_avg
+        segment = {
+            "jeepney_id": jeepney_id,
+            "segment_start": unit.segment_start,
+            "segment_end": timestamp,
+            "samples": len(samples),
+            "sensed_avg": sensed_avg,
+            "sensed_min": min(samples),
+            "sensed_max": max(samples),
+            "fare_avg": fare_avg,
+            "discrepancy": discrepancy,
+            "flagged": abs(discrepancy) >= Config.SENSOR_DISCREPANCY_THRESHOLD
+        }
+
+        summary = self.reconciliation[jeepney_id]
+        summary["segments"] += 1
+        summary["total_discrepancy"] += discrepancy
+        summary["max_discrepancy"] = max(summary["max_discrepancy"], abs(discrepancy))
+        summary["flagged_segments"] += 1 if segment["flagged"] else 0
+
+        unit.segment_start = timestamp
+        unit.sample_count = 0
+
+        self._unsaved.append(segment)
+        if len(self._unsaved) >= Config.SENSOR_FLUSH_SEGMENTS:
+            self.flush()
+        return segment
+
+    def flush(self):
+        """Persist buffered segments in one batch"""
+        if self._unsaved and self.sensor_queries is not None:
+            self.sensor_queries.save_segments(self._unsaved)
+        self._unsaved = []
+
+    def get_sensed_occupancy(self, jeepney_id: str) -> int:
+        return self.units[jeepney_id].sensed
+
+    def get_unit_reconciliation(self, jeepney_id: str) -> Dict[str, Any]:
+        """Sensed vs fare-based occupancy across all closed segments of a unit"""
+        summary = self.reconciliation[jeepney_id]
+        segments = summary["segments"]
+        return {
+            "jeepney_id": jeepney_id,
+            "segments": segments,
+            "average_discrepancy": summary["total_discrepancy"] / segments if segments else 0.0,
+            "max_discrepancy": summary["max_discrepancy"],
+            "flagged_segments": summary["flagged_segments"]
+        }
+
+
+class SeatSensorFeed:
+    """Streams live readings from a unit's seat sensors into a pipeline
+
+    Uses SeatSensorSimulator as the sensor source; the simulated seats
+    follow the jeepney's fare-based occupancy plus any riders who did not
+    pay (riders_without_fare).
+    """
+
+    def __init__(self, jeepney, pipeline: SeatOccupancyPipeline,
+                 simulator: SeatSensorSimulator = None, riders_without_fare: int = 0):
+        self.jeepney = jeepney
+        self.pipeline = pipeline
+        self.simulator = simulator or SeatSensorSimulator(jeepney.jeepney_id, jeepney.capacity)
+        self.riders_without_fare = riders_without_fare
+        self._lock = threading.Lock()  # the pipeline is fed from both the reader and the driver
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.pipeline.register_unit(self.jeepney, time.time())
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="seat-sensors", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.simulator.report_interval):
+            occupied = min(self.jeepney.capacity,
+                           self.jeepney.get_current_occupancy() + self.riders_without_fare)
+            with self._lock:
+                self.pipeline.ingest_many(self.simulator.readings(time.time(), occupied))
+
+    def record_stop(self):
+        """The driver is recording a boarding or alighting: end the segment at this stop"""
+        if self._thread is None:
+            return
+        with self._lock:
+            self.pipeline.record_stop(self.jeepney.jeepney_id, time.time())
+
+    def stop(self):
+        """Stop reading, close the open segment and persist everything buffered"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.pipeline.close_segment(self.jeepney.jeepney_id, time.time())
+        self.pipeline.flush()
@@ -0,0 +1,45 @@
+import os
+import pytest
+from config import Config
+from database.backends import create_backend
+from database.connection import DatabaseManager
+from database.migrations import setup_database
+from models.transaction import Transaction
+
+
+# Database tests run against every backend. PostgreSQL runs only when
+# TEST_POSTGRES_URL points at a scratch database (its tables are dropped).
+POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+TABLES = ["cash_turnins", "forecast_models", "occupancy_segments", "anomaly_alerts", "transactions", "jeepneys"]
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def db(request, tmp_path, monkeypatch):
+    if request.param == "sqlite":
+        url = f"sqlite:///{tmp_path / 'test.db'}"
+    else:
+        if not POSTGRES_URL:
+            pytest.skip("TEST_POSTGRES_URL not set")
+        pytest.importorskip("psycopg2")
+        url = POSTGRES_URL
+        create_backend(url).executescript(
+            "".join(f"DROP TABLE IF EXISTS {table} CASCADE;" for table in TABLES)
+        )
+    monkeypatch.setattr(Config, "DATABASE_URL", url)
+    db_manager = DatabaseManager()
+    setup_database(db_manager)
+    return db_manager
+
+
+def make_transaction(transaction_id, jeepney_id, when, amount_paid=13.00, passenger_type="regular"):
+    return Transaction(
+        transaction_id=transaction_id,
+        jeepney_id=jeepney_id,
+        passenger_type=passenger_type,
+        required_fare=Config.BASE_FARES[passenger_type],
+        amount_paid=amount_paid,
+        change_given=0,
+        payment_status="",
+        boarding_location="Terminal",
+        transaction_time=when
+    )
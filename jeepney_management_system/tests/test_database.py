@@ -0,0 +1,99 @@
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from config import Config
+from database.backends import StorageBackend, create_backend
+from database.migrations import setup_database
+from database.queries import JeepneyQueries, TransactionQueries
+from models.jeepney import Jeepney
+from tests.conftest import TABLES, make_transaction
+
+
+def test_setup_database_is_idempotent(db):
+    setup_database(db)
+    for table in TABLES:
+        assert db.execute_query(f"SELECT COUNT(*) AS n FROM {table}")[0]['n'] == 0
+
+
+def test_create_backend_rejects_unknown_scheme():
+    with pytest.raises(ValueError):
+        create_backend("mysql://localhost/jeepney")
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_concurrent_writers_beyond_pool_size(db):
+    JeepneyQueries(db).save_jeepney(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    queries = TransactionQueries(db)
+    writers = 3 * Config.DB_POOL_SIZE
+
+    def write(n):
+        queries.save_transaction(make_transaction(f"t{n:03d}", "JP1", datetime(2024, 5, 6, 7, n % 60)))
+
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(write, range(writers)))
+    assert len(queries.get_transactions_by_date("2024-05-06")) == writers
+
+
+def test_save_jeepney_upserts(db):
+    queries = JeepneyQueries(db)
+    jeepney = Jeepney("JP1", "ABC123", "Juan", "01A")
+    queries.save_jeepney(jeepney)
+    jeepney.status = "maintenance"
+    queries.save_jeepney(jeepney)
+    assert queries.get_jeepney("JP1")['status'] == "maintenance"
+
+
+def test_bulk_insert_and_streaming_reads(db):
+    JeepneyQueries(db).save_jeepney(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    queries = TransactionQueries(db)
+    batch = [make_transaction(f"t{i:04d}", "JP1", datetime(2024, 5, 6, 6 + i // 100, i % 60))
+             for i in range(250)]
+    batch[0].destination = None
+    queries.save_transactions(batch)
+
+    streamed = list(queries.iter_transactions_by_date_range("2024-05-06", "2024-05-06", batch_size=40))
+    assert len(streamed) == 250
+    assert streamed[0]['destination'] is None
+    assert sum(row['amount_paid'] for row in streamed) == pytest.approx(250 * 13.00)
+
+
+def test_transactions_by_date_and_hourly_rollups(db):
+    jeepney = Jeepney("JP1", "ABC123", "Juan", "01A")
+    JeepneyQueries(db).save_jeepney(jeepney)
+    queries = TransactionQueries(db)
+    queries.save_transaction(make_transaction("t1", "JP1", datetime(2024, 5, 6, 7, 15)))
+    queries.save_transaction(make_transaction("t2", "JP1", datetime(2024, 5, 6, 7, 45), amount_paid=20.00))
+    queries.save_transaction(make_transaction("t3", "JP1", datetime(2024, 5, 7, 8, 0)))
+
+    assert [t['transaction_id'] for t in queries.get_transactions_by_date("2024-05-06")] == ["t1", "t2"]
+    assert len(queries.get_transactions_by_date_range("2024-05-06", "2024-05-07")) == 3
+
+    rollups = queries.get_hourly_rollups("2024-05-06", "2024-05-06")
+    assert len(rollups) == 1
+    assert rollups[0]['route_id'] == "01A"
+    assert rollups[0]['hour'] == 7
+    assert rollups[0]['passengers'] == 2
+    assert rollups[0]['revenue'] == pytest.approx(26.00)
+
+
+def test_keyset_pagination_streams_filtered_pages(db):
+    jeepney_queries = JeepneyQueries(db)
+    jeepney_queries.save_jeepney(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    jeepney_queries.save_jeepney(Jeepney("JP2", "XYZ789", "Maria", "02B"))
+    queries = TransactionQueries(db)
+    for i in range(25):
+        # Same timestamp for several rows to exercise the transaction_id tie-breaker
+        when = datetime(2024, 5, 6, 7, i // 3)
+        queries.save_transaction(make_transaction(f"a{i:02d}", "JP1", when))
+        queries.save_transaction(make_transaction(f"b{i:02d}", "JP2", when, amount_paid=20.00))
+
+    pages = list(queries.iter_transaction_pages(page_size=10, plate_number="ABC123"))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [t['transaction_id'] for p in pages for t in p] == [f"a{i:02d}" for i in range(25)]
+
+    overpaid = list(queries.iter_transaction_pages(page_size=7, route_id="02B", payment_status="overpaid"))
+    assert sum(len(p) for p in overpaid) == 25
+
+    units = list(jeepney_queries.iter_jeepney_pages(page_size=1))
+    assert [p[0]['jeepney_id'] for p in units] == ["JP1", "JP2"]
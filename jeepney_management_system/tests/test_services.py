@@ -0,0 +1,436 @@
+import csv
+import json
+from datetime import datetime, timedelta
+import pytest
+from config import Config
+from database.queries import JeepneyQueries, TransactionQueries, ReconciliationQueries, SensorQueries, DATETIME_FORMAT
+from models.jeepney import Jeepney
+from models.passenger import Passenger
+from services.anomaly_detector import AnomalyDetector
+from services.depot_monitor import DepotMonitor
+from services.dispatch_scheduler import DispatchScheduler
+from services.forecasting import ForecastingService, SeasonalModel
+from services.reconciliation import ReconciliationService
+from services.report_generator import ReportGenerator
+from services.seat_sensors import SeatOccupancyPipeline, SeatSensorSimulator
+from tests.conftest import make_transaction
+
+
+class FakeTransactionQueries:
+    """Serves hourly rollups from memory and records each request"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def get_hourly_rollups(self, start_date, end_date):
+        self.calls.append((start_date, end_date))
+        return [r for r in self.rows if start_date <= r['day'] <= end_date]
+
+
+def daily_rollups(start, days, route_id="01A"):
+    rows = []
+    for offset in range(days):
+        day = (start + timedelta(days=offset)).strftime("%Y-%m-%d")
+        rows.append({"route_id": route_id, "day": day, "hour": 7, "passengers": 40, "revenue": 520.0})
+        rows.append({"route_id": route_id, "day": day, "hour": 12, "passengers": 10, "revenue": 130.0})
+    return rows
+
+
+def test_seasonal_model_learns_hour_of_week_pattern():
+    model = SeasonalModel(alpha=0.2, gamma=0.3)
+    for _ in range(4):
+        for slot in range(168):
+            model.update(slot, 30.0 if slot % 24 == 7 else 2.0)
+    assert model.predict(7) == pytest.approx(30.0, abs=1.0)
+    assert model.predict(3) == pytest.approx(2.0, abs=1.0)
+
+
+def test_close_day_updates_incrementally_and_invalidates_cache():
+    start = datetime(2024, 4, 1)
+    queries = FakeTransactionQueries(daily_rollups(start, 29))
+    service = ForecastingService(queries)
+    service.warm_up("2024-04-28", days=28)
+
+    forecast = service.forecast_route("01A", hours=24)
+    assert forecast[7]["passengers"] > forecast[3]["passengers"]
+
+    # Cached forecasts are handed out as copies
+    forecast[7]["passengers"] = -1
+    assert service.forecast_route("01A", hours=24)[7]["passengers"] > 0
+    assert ("01A", 24) in service._forecast_cache
+
+    service.close_day("2024-04-29")
+    assert queries.calls[-1] == ("2024-04-29", "2024-04-29")
+    assert ("01A", 24) not in service._forecast_cache
+
+    # Closing the same day twice is a no-op
+    service.close_day("2024-04-29")
+    assert len(queries.calls) == 2
+
+
+class FakeForecastQueries:
+    """Keeps saved model state in memory"""
+
+    def __init__(self):
+        self.closed_through = None
+        self.states = {}
+
+    def save_models(self, closed_through, states):
+        self.closed_through = closed_through
+        self.states = json.loads(json.dumps(states))
+
+    def load_models(self):
+        return self.closed_through, self.states
+
+
+def test_saved_models_resume_without_refitting_history(monkeypatch):
+    start = datetime(2024, 4, 1)
+    queries = FakeTransactionQueries(daily_rollups(start, 30))
+    saved = FakeForecastQueries()
+    monkeypatch.setattr(Config, "FORECAST_HISTORY_DAYS", 28)
+    ForecastingService(queries, forecast_queries=saved).refresh("2024-04-28")
+    assert saved.closed_through == "2024-04-28"
+
+    # A new process picks up the saved state and only folds in the new days
+    resumed = ForecastingService(queries, forecast_queries=saved)
+    resumed.refresh("2024-04-30")
+    assert queries.calls[-1] == ("2024-04-29", "2024-04-30")
+
+    refitted = ForecastingService(queries)
+    refitted.warm_up("2024-04-30", days=30)
+    expected = [f["passengers"] for f in refitted.forecast_route("01A", hours=24)]
+    assert [f["passengers"] for f in resumed.forecast_route("01A", hours=24)] == pytest.approx(expected)
+
+
+def test_refresh_leaves_the_current_day_open():
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    queries = FakeTransactionQueries(daily_rollups(today - timedelta(days=28), 29))
+    saved = FakeForecastQueries()
+    service = ForecastingService(queries, forecast_queries=saved)
+
+    # A mid-day reconcile must not close today with its remaining hours at zero
+    service.refresh(today.strftime("%Y-%m-%d"))
+    assert queries.calls[-1][1] == yesterday
+    assert saved.closed_through == yesterday
+
+    # Once today has ended it is folded in as usual
+    service.close_day(today.strftime("%Y-%m-%d"))
+    assert queries.calls[-1] == (today.strftime("%Y-%m-%d"),) * 2
+
+
+class FixedForecast:
+    """Predicts the same demand for every route and hour"""
+
+    def __init__(self, passengers=30, revenue=400.0):
+        self.prediction = {"passengers": passengers, "revenue": revenue}
+
+    def predict_hour(self, route_id, moment):
+        return dict(self.prediction)
+
+
+def make_fleet(scheduler, route_id, count, passengers=0, prefix=None):
+    for i in range(count):
+        jeepney = Jeepney(f"{prefix or route_id}-{i}", f"PLT{i}", "Driver", route_id)
+        scheduler.observe(jeepney)
+        scheduler.update_occupancy(jeepney.jeepney_id, passengers)
+
+
+def test_dispatch_moves_quiet_unit_to_busy_route():
+    scheduler = DispatchScheduler()
+    make_fleet(scheduler, "01A", 2, passengers=19)
+    make_fleet(scheduler, "02B", 3, passengers=2)
+    scheduler.update_occupancy("02B-1", 0)
+
+    suggestion = scheduler.suggest_dispatch()
+    assert suggestion["to_route"] == "01A"
+    assert suggestion["from_route"] == "02B"
+    assert suggestion["jeepney_id"] == "02B-1"
+
+    headways = scheduler.apply_dispatch(suggestion)
+    assert {h["route_id"]: h["active_units"] for h in headways} == {"02B": 2, "01A": 3}
+
+
+def test_dispatch_ignores_units_out_of_service_and_emits_to_listeners():
+    scheduler = DispatchScheduler()
+    emitted = []
+    scheduler.subscribe(emitted.append)
+    make_fleet(scheduler, "01A", 1, passengers=10)
+    make_fleet(scheduler, "02B", 2, passengers=0)
+    assert scheduler.suggest_dispatch() is None
+
+    scheduler.update_status("02B-0", "maintenance")
+    scheduler.set_predicted_load("01A", 18)
+    assert scheduler.suggest_dispatch() is None  # 02B has no spare active unit left
+
+    scheduler.update_status("02B-0", "active")
+    assert emitted and emitted[-1]["to_route"] == "01A"
+
+    with pytest.raises(ValueError):
+        scheduler.update_status("02B-0", "parked")
+
+
+def test_dispatch_emits_headway_changes_and_picks_emptiest_donor_unit():
+    scheduler = DispatchScheduler()
+    make_fleet(scheduler, "01A", 1, passengers=20)
+    make_fleet(scheduler, "02B", 4, passengers=5)
+    scheduler.update_occupancy("02B-2", 1)
+    scheduler.update_occupancy("02B-3", 0)
+    scheduler.update_occupancy("02B-3", 9)
+
+    emitted = []
+    scheduler.subscribe(emitted.append)
+    scheduler.update_status("02B-1", "maintenance")
+    assert emitted[0] == {"action": "headway", "route_id": "02B", "active_units": 3, "headway_minutes": 20.0}
+    assert scheduler.suggest_dispatch()["jeepney_id"] == "02B-2"
+
+    scheduler.reassign_unit("02B-2", "01A")
+    assert [(e["route_id"], e["active_units"]) for e in emitted if e["action"] == "headway"][-2:] == [
+        ("02B", 2), ("01A", 2)
+    ]
+
+
+def test_depot_monitor_feeds_persisted_units_to_scheduler(db):
+    queries = JeepneyQueries(db)
+    busy = Jeepney("JP1", "ABC123", "Juan", "01A")
+    queries.save_jeepney(busy)
+    queries.save_jeepney(Jeepney("JP2", "XYZ789", "Maria", "02B"))
+
+    monitor = DepotMonitor(queries, forecasting_service=FixedForecast(passengers=90))
+    monitor.poll_once()
+    assert set(monitor.scheduler.units) == {"JP1", "JP2"}
+    # 90 boardings an hour at 20 minutes a ride keeps about 30 on board
+    assert monitor.scheduler.routes["01A"].predicted_load == pytest.approx(30.0)
+
+    busy.current_passengers.extend(Passenger(f"p{i}", "regular", "Terminal") for i in range(12))
+    queries.update_occupancy(busy)
+    monitor.poll_once()
+    assert monitor.scheduler.units["JP1"].passengers == 12
+
+
+def test_depot_monitor_reads_unit_writes_that_commit_late(db):
+    queries = JeepneyQueries(db)
+    queries.save_jeepney(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    monitor = DepotMonitor(queries)
+    now = datetime.now()
+    monitor.poll_once(now)
+
+    # Stamped before the last poll, but its write only committed after it
+    late = Jeepney("JP2", "XYZ789", "Maria", "02B")
+    queries.save_jeepney(late)
+    stamp = (now - timedelta(seconds=2)).strftime(DATETIME_FORMAT)
+    db.execute_query("UPDATE jeepneys SET updated_at = ? WHERE jeepney_id = ?", (stamp, "JP2"))
+    monitor.poll_once(now + timedelta(seconds=1))
+    assert set(monitor.scheduler.units) == {"JP1", "JP2"}
+
+
+def test_anomaly_detector_flags_change_and_discount_outliers():
+    sink = []
+    detector = AnomalyDetector(alert_sink=sink.append)
+    detector.register_unit(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    start = datetime(2024, 5, 6, 6, 0)
+
+    for i in range(60):
+        detector.observe(make_transaction(f"t{i}", "JP1", start + timedelta(minutes=i), amount_paid=20.00))
+    assert sink == []
+
+    # Juan has only driven JP1, so his own statistics don't repeat the unit's alert
+    alerts = detector.observe(make_transaction("t60", "JP1", start + timedelta(minutes=61), amount_paid=500.00))
+    assert {(a["kind"], a["entity_type"]) for a in alerts} == {("unusual_change", "unit")}
+
+    # A run of discounted fares on one unit while the rest of the fleet stays regular
+    detector.register_unit(Jeepney("JP2", "XYZ789", "Maria", "02B"))
+    for i in range(61, 100):
+        when = start + timedelta(minutes=i + 1)
+        detector.observe(make_transaction(f"t{i}", "JP1", when, passenger_type="student"))
+        detector.observe(make_transaction(f"t{i + 100}", "JP2", when))
+    assert [a["entity_id"] for a in sink if a["kind"] == "discount_ratio"] == ["JP1"]
+    assert len(detector.unit_stats) == 2 and len(detector.driver_stats) == 2
+
+
+def test_anomaly_detector_alerts_on_drivers_across_units():
+    detector = AnomalyDetector()
+    start = datetime(2024, 5, 6, 6, 0)
+    detector.register_unit(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    detector.register_unit(Jeepney("JP2", "XYZ789", "Juan", "01A"))
+    for i in range(40):
+        jeepney_id = "JP1" if i < 20 else "JP2"
+        detector.observe(make_transaction(f"t{i}", jeepney_id, start + timedelta(minutes=i), amount_paid=20.00))
+
+    alerts = detector.observe(make_transaction("t40", "JP2", start + timedelta(minutes=41), amount_paid=500.00))
+    assert ("unusual_change", "driver", "Juan") in {(a["kind"], a["entity_type"], a["entity_id"]) for a in alerts}
+
+
+def test_anomaly_detector_flags_revenue_dip_against_forecast():
+    detector = AnomalyDetector(forecasting_service=FixedForecast(revenue=400.0))
+    detector.register_unit(Jeepney("JP1", "ABC123", "Juan", "01A"))
+    detector.observe(make_transaction("t1", "JP1", datetime(2024, 5, 6, 7, 10)))
+    alerts = detector.flush(datetime(2024, 5, 6, 8, 5))
+    assert [a["kind"] for a in alerts] == ["revenue_dip"]
+    assert detector.get_hourly_revenue("01A")[7] == pytest.approx(13.00)
+
+
+def test_anomaly_detector_checks_routes_that_record_no_fares():
+    detector = AnomalyDetector(forecasting_service=FixedForecast(revenue=400.0))
+    detector.set_unit("JP1", "Juan", "01A")
+    assert detector.flush(datetime(2024, 5, 6, 7, 5)) == []
+    alerts = detector.flush(datetime(2024, 5, 6, 8, 5))
+    assert [(a["kind"], a["entity_id"], a["value"]) for a in alerts] == [("revenue_dip", "01A", 0.0)]
+
+
+def test_depot_monitor_feeds_every_units_transactions_to_detector(db):
+    jeepney_queries = JeepneyQueries(db)
+    transactions = TransactionQueries(db)
+    start = datetime(2024, 5, 6, 7, 0)
+    for n, (plate, driver) in enumerate([("AAA111", "Juan"), ("BBB222", "Maria"), ("ZZZ000", "Pedro")]):
+        jeepney_queries.save_jeepney(Jeepney(f"JP{n}", plate, driver, "01A"))
+    # Earlier in the week the fleet carried one discounted passenger in ten
+    for i in range(100):
+        ptype = "student" if i % 10 == 0 else "regular"
+        transactions.save_transaction(make_transaction(f"h{i}", "JP0", start - timedelta(days=2, minutes=i),
+                                                       passenger_type=ptype))
+
+    sink = []
+    detector = AnomalyDetector(alert_sink=sink.append, forecasting_service=FixedForecast(revenue=2000.0))
+    monitor = DepotMonitor(jeepney_queries, transaction_queries=transactions, anomaly_detector=detector)
+    monitor.poll_once(start)
+    assert detector.fleet_discounts.ratio == pytest.approx(0.1)
+
+    # JP1 sells nothing but discounted fares from its first trip
+    for i in range(30):
+        when = start + timedelta(minutes=i)
+        transactions.save_transaction(make_transaction(f"a{i:02d}", "JP1", when, passenger_type="student"))
+        transactions.save_transaction(make_transaction(f"b{i:02d}", "JP2", when))
+    monitor.poll_once(start + timedelta(minutes=40))
+    assert [(a["kind"], a["entity_id"]) for a in sink] == [("discount_ratio", "JP1")]
+    assert len(detector.unit_stats) == 2
+
+    # The closed hour fell well short of forecast on the route, even with no new traffic
+    monitor.poll_once(start + timedelta(hours=1, minutes=1))
+    assert sink[-1]["kind"] == "revenue_dip" and sink[-1]["entity_id"] == "01A"
+
+
+def test_seat_sensor_pipeline_debounces_flicker_and_reconciles(db):
+    jeepney = Jeepney("JP1", "ABC123", "Juan", "01A")
+    JeepneyQueries(db).save_jeepney(jeepney)
+    for i in range(5):
+        jeepney.current_passengers.append(Passenger(f"p{i}", "regular", "Terminal"))
+
+    start = datetime(2024, 5, 6, 7, 0).timestamp()
+    pipeline = SeatOccupancyPipeline(SensorQueries(db))
+    pipeline.register_unit(jeepney, start)
+    simulator = SeatSensorSimulator("JP1", jeepney.capacity, flicker_rate=0.05, seed=7)
+
+    # Eight people are seated but only five paid
+    segments = pipeline.ingest_many(simulator.events(start, 600, lambda t: 8))
+    pipeline.flush()
+
+    assert len(segments) == 1
+    assert pipeline.get_sensed_occupancy("JP1") == 8
+    assert segments[0]["sensed_max"] == 8
+    assert segments[0]["discrepancy"] == pytest.approx(3.0, abs=0.2)
+    assert pipeline.get_unit_reconciliation("JP1")["flagged_segments"] == 1
+
+    saved = SensorQueries(db).get_segments_by_date("2024-05-06", "JP1")
+    assert len(saved) == 1 and saved[0]['fare_avg'] == pytest.approx(5.0)
+
+
+def test_seat_sensor_segment_compares_fares_over_the_same_ticks():
+    jeepney = Jeepney("JP1", "ABC123", "Juan", "01A")
+    start = datetime(2024, 5, 6, 7, 0).timestamp()
+    pipeline = SeatOccupancyPipeline()
+    pipeline.register_unit(jeepney, start)
+    simulator = SeatSensorSimulator("JP1", jeepney.capacity, flicker_rate=0.05, seed=7)
+
+    # Empty for 150 s, then eight passengers board and pay
+    segments = pipeline.ingest_many(simulator.events(start, 150, lambda t: 0))
+    jeepney.current_passengers.extend(Passenger(f"p{i}", "regular", "Terminal") for i in range(8))
+    segments += pipeline.ingest_many(simulator.events(start + 150, 160, lambda t: 8))
+
+    assert len(segments) == 1
+    assert segments[0]["fare_avg"] == pytest.approx(4.0, abs=0.1)
+    assert segments[0]["discrepancy"] == pytest.approx(0.0, abs=0.2)
+    assert not segments[0]["flagged"]
+
+
+def test_seat_sensor_segments_end_at_stops():
+    jeepney = Jeepney("JP1", "ABC123", "Juan", "01A")
+    start = datetime(2024, 5, 6, 7, 0).timestamp()
+    pipeline = SeatOccupancyPipeline()
+    pipeline.register_unit(jeepney, start)
+    simulator = SeatSensorSimulator("JP1", jeepney.capacity, flicker_rate=0.0)
+
+    # Three riders from the terminal, then a stop where four more board
+    jeepney.current_passengers.extend(Passenger(f"p{i}", "regular", "Terminal") for i in range(3))
+    pipeline.ingest_many(simulator.events(start, 120, lambda t: 3))
+    first = pipeline.record_stop("JP1", start + 120)
+    for i in range(4):
+        assert pipeline.record_stop("JP1", start + 121 + i) is None  # same stop
+        jeepney.current_passengers.append(Passenger(f"q{i}", "regular", "Quiapo"))
+    pipeline.ingest_many(simulator.events(start + 125, 90, lambda t: 7))
+    second = pipeline.record_stop("JP1", start + 215)
+
+    assert first["segment_end"] == start + 120 and first["fare_avg"] == pytest.approx(3.0)
+    assert second["segment_start"] == start + 120
+    assert second["sensed_max"] == 7 and not second["flagged"]
+
+
+def test_reconciliation_flags_cash_and_unsaved_differences(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "RECONCILE_CHUNK_SIZE", 2)
+
+    transactions = TransactionQueries(db)
+    turnins = ReconciliationQueries(db)
+    when = datetime(2024, 5, 6, 8, 0)
+    for n, plate in enumerate(["AAA111", "BBB222", "CCC333"]):
+        jeepney = Jeepney(f"JP_{plate}", plate, f"Driver {n}", "01A")
+        jeepney.created_at = when
+        JeepneyQueries(db).save_jeepney(jeepney)
+        for i in range(4):
+            transaction = make_transaction(f"{plate}-{i}", jeepney.jeepney_id, when, amount_paid=20.00)
+            jeepney.daily_transactions.append(transaction)
+            transactions.save_transaction(transaction)
+        totals = jeepney.get_daily_totals()
+        if plate == "BBB222":
+            turnins.save_turnin(jeepney.jeepney_id, "2024-05-06", totals["net_revenue"] - 13, totals)
+        elif plate == "AAA111":
+            turnins.save_turnin(jeepney.jeepney_id, "2024-05-06", totals["net_revenue"], totals)
+
+    serial = ReconciliationService(workers=1).reconcile_day("2024-05-06")
+    parallel = ReconciliationService(workers=2).reconcile_day("2024-05-06")
+    assert serial == parallel
+
+    statuses = {r["jeepney_id"]: r["status"] for r in parallel}
+    assert statuses == {"JP_AAA111": "ok", "JP_BBB222": "discrepancy", "JP_CCC333": "missing_turnin"}
+    short = next(r for r in parallel if r["jeepney_id"] == "JP_BBB222")
+    assert short["net_revenue"] == pytest.approx(52.00)
+    assert short["cash_difference"] == pytest.approx(-13.00)
+
+    path = ReportGenerator(str(tmp_path / "reports")).write_discrepancy_report("2024-05-06", parallel)
+    with open(path) as f:
+        rows = list(csv.DictReader(f))
+    assert rows[-1]["status"] == "ok"
+
+
+def test_reconciliation_sums_restarted_sessions_across_midnight(db):
+    turnins = ReconciliationQueries(db)
+    shift_start = datetime(2024, 5, 6, 21, 0)
+    # Driver mode restarted mid-shift: same unit ID, the second session runs past midnight
+    for session, start in enumerate([shift_start, shift_start + timedelta(hours=2)]):
+        jeepney = Jeepney("JP_AAA111_20240506", "AAA111", "Driver", "01A")
+        jeepney.created_at = start
+        JeepneyQueries(db).save_jeepney(jeepney)
+        for i in range(3):
+            transaction = make_transaction(f"{session}-{i}", jeepney.jeepney_id,
+                                           start + timedelta(hours=i), amount_paid=13.00)
+            jeepney.daily_transactions.append(transaction)
+            TransactionQueries(db).save_transaction(transaction)
+        totals = jeepney.get_daily_totals()
+        turnins.save_turnin(jeepney.jeepney_id, jeepney.created_at.strftime("%Y-%m-%d"),
+                            totals["net_revenue"], totals)
+
+    results = ReconciliationService(workers=1).reconcile_day("2024-05-06")
+    assert [r["status"] for r in results] == ["ok"]
+    assert results[0]["passengers"] == 6
+    assert results[0]["cash_turned_in"] == pytest.approx(78.00)
+    assert ReconciliationService(workers=1).reconcile_day("2024-05-07") == []
@@ -0,0 +1,164 @@
+import json
+import time
+import pytest
+from utils import metrics
+
+
+@pytest.fixture
+def instrumentation():
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.REGISTRY.reset()
+
+
+def test_histogram_buckets_and_text_rendering(instrumentation):
+    hist = metrics.histogram("test_latency_seconds", "Test latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        hist.observe(value)
+    text = metrics.REGISTRY.render_text()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{le="1.0"} 3' in text
+    assert 'test_latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "test_latency_seconds_count 4" in text
+
+
+def test_timed_records_only_when_enabled():
+    @metrics.timed("test_timed_seconds")
+    def work():
+        return 42
+
+    hist = metrics.histogram("test_timed_seconds")
+    assert work() == 42
+    assert hist.count == 0
+
+    metrics.enable()
+    try:
+        work()
+        with metrics.timer("test_timed_seconds"):
+            pass
+    finally:
+        metrics.disable()
+    assert hist.count == 2
+    metrics.REGISTRY.reset()
+
+
+def test_instrumented_fare_calculator_counts_rejections(instrumentation):
+    from services.fare_calculator import FareCalculator
+    calculator = FareCalculator()
+    calculator.validate_payment(13.00, 10.00)
+    assert metrics.counter("fare_payments_rejected_total").value == 1
+    assert metrics.histogram("fare_validate_payment_seconds").count == 1
+
+
+def test_exported_snapshots_merge_into_fleet_metrics(instrumentation, tmp_path):
+    metrics.counter("test_rides_total", "Rides").inc(2)
+    metrics.histogram("test_ride_seconds", "Ride time", buckets=(1.0, 10.0)).observe(0.5)
+
+    # What a driver process would have exported
+    exporter = metrics.MetricsExporter("driver", directory=str(tmp_path))
+    exporter.export()
+    with open(exporter.path) as f:
+        data = json.load(f)
+    assert data["role"] == "driver" and data["profile"] is None
+    data["pid"] = -1
+    with open(tmp_path / "driver-other.json", "w") as f:
+        json.dump(data, f)
+
+    snapshots = metrics.read_snapshots(str(tmp_path))
+    assert [d["pid"] for d in snapshots] == [-1]  # this process's own export is skipped
+    text = metrics.fleet_registry(snapshots).render_text()
+    assert "test_rides_total 4" in text
+    assert 'test_ride_seconds_bucket{le="1.0"} 2' in text
+
+
+def test_sampling_profiler_collects_stacks():
+    profiler = metrics.SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.time() + 0.1
+    while time.time() < deadline:
+        sum(range(1000))
+    profiler.stop()
+    assert profiler.total_samples > 0
+    assert "samples" in profiler.format_report(limit=3)
+
+
+def write_json(path, data):
+    import json
+    import os
+    path.write_text(json.dumps(data))
+    # Make sure the change is visible even on coarse mtime filesystems
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_config_registry_builds_indexed_snapshot(tmp_path):
+    from utils.config_registry import ConfigRegistry
+    fares = tmp_path / "fares.json"
+    routes = tmp_path / "routes.json"
+    write_json(fares, {"fares": {"regular": 13, "student": 11}})
+    write_json(routes, {"routes": [{"route_id": "01a", "name": "Cubao - Divisoria",
+                                    "stops": ["Cubao", "Quiapo", "Divisoria"]}]})
+
+    snapshot = ConfigRegistry(str(fares), str(routes)).current()
+    assert snapshot.passenger_types == ("regular", "student")
+    assert snapshot.discount_types == {"student"}
+    assert snapshot.routes["01A"].stop_index["Quiapo"] == 1
+    with pytest.raises(TypeError):
+        snapshot.fares["regular"] = 0
+
+
+def test_config_registry_hot_reloads_and_keeps_last_good_snapshot(tmp_path):
+    from utils.config_registry import ConfigRegistry
+    fares = tmp_path / "fares.json"
+    write_json(fares, {"fares": {"regular": 13, "student": 11}})
+    registry = ConfigRegistry(str(fares), str(tmp_path / "routes.json"), check_interval=0)
+    before = registry.current()
+
+    write_json(fares, {"fares": {"regular": 15, "student": 12, "senior": 12}})
+    after = registry.current()
+    assert after.version == before.version + 1
+    assert after.fares["regular"] == 15
+    assert before.fares["regular"] == 13  # old snapshot untouched
+
+    fares.write_text("{not json")
+    assert registry.current() is after
+    write_json(fares, {"fares": {"student": 11}})  # no regular fare
+    assert registry.current() is after
+
+
+def test_config_registry_keeps_fares_when_file_is_emptied(tmp_path):
+    from utils.config_registry import ConfigRegistry
+    fares = tmp_path / "fares.json"
+    write_json(fares, {"fares": {"regular": 20, "student": 16}})
+    registry = ConfigRegistry(str(fares), str(tmp_path / "routes.json"), check_interval=0)
+    live = registry.current()
+
+    fares.write_text("")  # truncated by an editor mid-save
+    assert registry.current() is live
+    write_json(fares, {"fares": {}})
+    assert registry.current() is live
+    fares.unlink()
+    assert registry.current() is live
+    assert live.fares["regular"] == 20
+
+    write_json(fares, {"fares": {"regular": 21, "student": 17}})
+    assert registry.current().fares["regular"] == 21
+
+
+def test_fare_calculator_follows_registry(tmp_path, monkeypatch):
+    import utils.config_registry as config_registry
+    from services.fare_calculator import FareCalculator
+    from utils.validators import InputValidator
+    fares = tmp_path / "fares.json"
+    write_json(fares, {"fares": {"regular": 13, "student": 11}})
+    monkeypatch.setattr(config_registry, "_registry",
+                        config_registry.ConfigRegistry(str(fares), str(tmp_path / "routes.json"), check_interval=0))
+
+    calculator = FareCalculator()
+    assert calculator.calculate_fare("student") == 11
+    assert not InputValidator.validate_passenger_type("pwd")
+
+    write_json(fares, {"fares": {"regular": 13, "student": 11, "pwd": 10}})
+    assert calculator.calculate_fare("pwd") == 10
+    assert InputValidator.validate_passenger_type("PWD")
@@ -0,0 +1,181 @@
+import os
+import sys
+import json
+import time
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Tuple, Mapping, FrozenSet, Optional
+from config import Config
+
+
+@dataclass(frozen=True)
+class RouteInfo:
+    """A route and its ordered stops"""
+    route_id: str
+    name: str
+    stops: Tuple[str, ...]
+    stop_index: Mapping[str, int]  # stop name -> position along the route
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Fares, passenger types and routes as loaded at one point in time
+
+    Snapshots are never modified; a reload builds a new one and swaps it
+    in, so a fare computed mid-reload always sees one consistent version.
+    """
+    version: int
+    fares: Mapping[str, float]
+    passenger_types: Tuple[str, ...]
+    passenger_type_set: FrozenSet[str]
+    discount_types: FrozenSet[str]
+    routes: Mapping[str, RouteInfo]
+
+    def get_route(self, route_id: str) -> Optional[RouteInfo]:
+        return self.routes.get(route_id)
+
+
+def _read_json(path: str) -> dict:
+    """Read a JSON file; a missing or empty file counts as {}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        content = f.read().strip()
+    return json.loads(content) if content else {}
+
+
+def build_snapshot(fares_file: str, routes_file: str, version: int,
+                   default_fares: bool = True) -> ConfigSnapshot:
+    """Parse the configuration files into an immutable, indexed snapshot
+
+    Config.BASE_FARES stands in for a missing fare table only when
+    default_fares is set (the first load); a reload that finds no fares,
+    e.g. a file truncated mid-save, raises instead.
+    """
+    fares_data = _read_json(fares_file)
+    raw_fares = fares_data.get("fares")
+    if not raw_fares:
+        if not default_fares:
+            raise ValueError(f"No fares defined in {fares_file}")
+        raw_fares = Config.BASE_FARES
+    # Interned so membership checks and dict lookups compare by identity first
+    fares = {sys.intern(str(ptype).lower()): float(fare) for ptype, fare in raw_fares.items()}
+    if "regular" not in fares:
+        raise ValueError("Fare table must define a 'regular' fare")
+
+    routes = {}
+    for entry in _read_json(routes_file).get("routes", []):
+        route_id = sys.intern(str(entry["route_id"]).upper())
+        stops = tuple(sys.intern(str(stop)) for stop in entry.get("stops", []))
+        routes[route_id] = RouteInfo(
+            route_id=route_id,
+            name=entry.get("name", route_id),
+            stops=stops,
+            stop_index=MappingProxyType({stop: i for i, stop in enumerate(stops)})
+        )
+
+    passenger_types = tuple(fares)
+    return ConfigSnapshot(
+        version=version,
+        fares=MappingProxyType(fares),
+        passenger_types=passenger_types,
+        passenger_type_set=frozenset(passenger_types),
+        discount_types=frozenset(t for t, fare in fares.items() if fare < fares["regular"]),
+        routes=MappingProxyType(routes)
+    )
+
+
+class ConfigRegistry:
+    """Shares one configuration snapshot across services and hot-reloads it
+
+    Readers only ever fetch the current snapshot reference. When a file
+    changes, the new snapshot is parsed on the side and swapped in with a
+    single assignment; if parsing fails the previous snapshot stays live.
+    """
+
+    def __init__(self, fares_file: str = None, routes_file: str = None,
+                 check_interval: float = None):
+        self.fares_file = fares_file or Config.FARES_FILE
+        self.routes_file = routes_file or Config.ROUTES_FILE
+        self.check_interval = Config.CONFIG_RELOAD_INTERVAL if check_interval is None else check_interval
+        self._reload_lock = threading.Lock()
+        self._stamps = self._file_stamps()
+        self._snapshot = build_snapshot(self.fares_file, self.routes_file, version=1)
+        self._last_check = time.monotonic()
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def current(self) -> ConfigSnapshot:
+        """The live snapshot (checks the files at most once per check_interval)"""
+        if self._watcher is None and time.monotonic() - self._last_check >= self.check_interval:
+            self.reload_if_changed()
+        return self._snapshot
+
+    def _file_stamps(self) -> tuple:
+        stamps = []
+        for path in (self.fares_file, self.routes_file):
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return tuple(stamps)
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the snapshot if either file changed; returns True on reload"""
+        # Only one reload at a time; other callers keep using the live snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            stamps = self._file_stamps()
+            if stamps == self._stamps:
+                return False
+            self._stamps = stamps
+            try:
+                snapshot = build_snapshot(self.fares_file, self.routes_file,
+                                          version=self._snapshot.version + 1,
+                                          default_fares=False)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠️ Configuration reload failed, keeping version {self._snapshot.version}: {e}")
+                return False
+            self._snapshot = snapshot
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def start_watcher(self, interval: float = None):
+        """Poll the files from a background thread so readers never do I/O"""
+        if self._watcher is not None:
+            return
+        interval = self.check_interval if interval is None else interval
+        self._stop.clear()
+
+        def watch():
+            while not self._stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watcher = threading.Thread(target=watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        if self._watcher is None:
+            return
+        self._stop.set()
+        self._watcher.join()
+        self._watcher = None
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ConfigRegistry:
+    """The process-wide registry shared by every service"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ConfigRegistry()
+    return _registry
@@ -0,0 +1,2 @@
+# Jeepney unit statuses
+JEEPNEY_STATUSES = ("active", "maintenance", "inactive")
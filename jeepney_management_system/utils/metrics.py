@@ -0,0 +1,370 @@
+import os
+import sys
+import json
+import time
+import bisect
+import functools
+import threading
+from collections import defaultdict
+from typing import List, Dict, Tuple
+from config import Config
+
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# Checked on every instrumented call; kept as a plain module global so the
+# disabled path is a single global lookup and a branch.
+_enabled = Config.METRICS_ENABLED
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+class Counter:
+    """Monotonically increasing count"""
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        if not _enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+    def reset(self):
+        with self._lock:
+            self.value = 0
+
+    def snapshot(self) -> dict:
+        return {"type": "counter", "help": self.help_text, "value": self.value}
+
+    def merge(self, snapshot: dict):
+        with self._lock:
+            self.value += snapshot["value"]
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.value}"
+        ]
+
+
+class Histogram:
+    """Distribution of observed values over fixed buckets"""
+
+    def __init__(self, name: str, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        if not _enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * (len(self.buckets) + 1)
+            self.total = 0.0
+            self.count = 0
+
+    def snapshot(self) -> dict:
+        return {"type": "histogram", "help": self.help_text, "buckets": list(self.buckets),
+                "counts": list(self.counts), "total": self.total, "count": self.count}
+
+    def merge(self, snapshot: dict):
+        if tuple(snapshot["buckets"]) != self.buckets:
+            raise ValueError(f"Bucket mismatch merging histogram {self.name}")
+        with self._lock:
+            self.counts = [a + b for a, b in zip(self.counts, snapshot["counts"])]
+            self.total += snapshot["total"]
+            self.count += snapshot["count"]
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram"
+        ]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {self.count}')
+        lines.append(f"{self.name}_sum {self.total:.6f}")
+        lines.append(f"{self.name}_count {self.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric so they can be rendered together"""
+
+    def __init__(self):
+        self.metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str = "") -> Counter:
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = Counter(name, help_text)
+            return self.metrics[name]
+
+    def histogram(self, name: str, help_text: str = "",
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            if name not in self.metrics:
+                self.metrics[name] = Histogram(name, help_text, buckets)
+            return self.metrics[name]
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Plain-data copy of every metric, for export to other processes"""
+        return {name: metric.snapshot() for name, metric in list(self.metrics.items())}
+
+    def merge(self, snapshot: Dict[str, dict]):
+        """Add another registry's snapshot into this one"""
+        for name, data in snapshot.items():
+            if data["type"] == "counter":
+                metric = self.counter(name, data["help"])
+            else:
+                metric = self.histogram(name, data["help"], tuple(data["buckets"]))
+            metric.merge(data)
+
+    def render_text(self) -> str:
+        """Render all metrics in the Prometheus text format"""
+        lines = []
+        for name in sorted(self.metrics):
+            lines.extend(self.metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def counter(name: str, help_text: str = "") -> Counter:
+    return REGISTRY.counter(name, help_text)
+
+
+def histogram(name: str, help_text: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.histogram(name, help_text, buckets)
+
+
+def timed(name: str, help_text: str = ""):
+    """Decorator recording call durations (in seconds) into a histogram"""
+    hist = histogram(name, help_text or "Call duration in seconds")
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class timer:
+    """Context manager recording the duration of a block into a histogram"""
+    __slots__ = ("hist", "start")
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.hist = histogram(name, help_text or "Call duration in seconds")
+        self.start = None
+
+    def __enter__(self):
+        if _enabled:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.start is not None:
+            self.hist.observe(time.perf_counter() - self.start)
+            self.start = None
+        return False
+
+
+def write_snapshot(path: str, role: str, profiler: "SamplingProfiler" = None):
+    """Write this process's metrics (and profile, if any) for other processes to read"""
+    data = {
+        "role": role,
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "metrics": REGISTRY.snapshot(),
+        "profile": profiler.format_report() if profiler else None
+    }
+    # Write then rename, so readers never see a half-written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshots(directory: str = None, max_age: float = None) -> List[dict]:
+    """Snapshots exported by other processes within max_age seconds, newest first"""
+    directory = directory or Config.METRICS_DIR
+    max_age = Config.METRICS_MAX_AGE if max_age is None else max_age
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if data["pid"] != os.getpid() and time.time() - data["written_at"] <= max_age:
+            snapshots.append(data)
+    return sorted(snapshots, key=lambda d: d["written_at"], reverse=True)
+
+
+def fleet_registry(snapshots: List[dict]) -> MetricsRegistry:
+    """This process's metrics merged with snapshots from other processes"""
+    merged = MetricsRegistry()
+    merged.merge(REGISTRY.snapshot())
+    for data in snapshots:
+        merged.merge(data["metrics"])
+    return merged
+
+
+class MetricsExporter:
+    """Periodically writes this process's snapshot to the shared metrics directory
+
+    Metrics live in each process's memory; exporting them lets the admin
+    console and the web endpoint show what driver processes measured.
+    """
+
+    def __init__(self, role: str, profiler: "SamplingProfiler" = None,
+                 directory: str = None, interval: float = None):
+        self.role = role
+        self.profiler = profiler
+        self.directory = directory or Config.METRICS_DIR
+        self.interval = Config.METRICS_EXPORT_INTERVAL if interval is None else interval
+        self.path = os.path.join(self.directory, f"{role}-{os.getpid()}.json")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def export(self):
+        os.makedirs(self.directory, exist_ok=True)
+        write_snapshot(self.path, self.role, self.profiler)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.wait(self.interval):
+                self.export()
+
+        self._thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop exporting and write a final snapshot"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.export()
+
+
+class SamplingProfiler:
+    """Opt-in profiler that periodically samples every thread's call stack"""
+
+    def __init__(self, interval: float = None, max_depth: int = 30):
+        self.interval = Config.PROFILER_INTERVAL if interval is None else interval
+        self.max_depth = max_depth
+        self.samples: Dict[tuple, int] = defaultdict(int)
+        self.total_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self.samples[self._stack(frame)] += 1
+                self.total_samples += 1
+
+    def _stack(self, frame) -> tuple:
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            code = frame.f_code
+            stack.append(f"{os.path.basename(code.co_filename)}:{frame.f_lineno}:{code.co_name}")
+            frame = frame.f_back
+        return tuple(reversed(stack))
+
+    def hottest_stacks(self, limit: int = 10) -> List[Tuple[int, tuple]]:
+        """Most frequently sampled call stacks, hottest first"""
+        # Copy first: the sampling thread may still be adding stacks
+        ranked = sorted(self.samples.copy().items(), key=lambda x: x[1], reverse=True)
+        return [(count, stack) for stack, count in ranked[:limit]]
+
+    def format_report(self, limit: int = 10) -> str:
+        lines = [f"Sampling profile: {self.total_samples} samples every {self.interval * 1000:.1f} ms"]
+        for count, stack in self.hottest_stacks(limit):
+            percent = (count / self.total_samples) * 100 if self.total_samples else 0
+            lines.append(f"\n{count} samples ({percent:.1f}%)")
+            for frame in stack:
+                lines.append(f"    {frame}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str, limit: int = 10):
+        """Write the hottest call stacks to a file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            f.write(self.format_report(limit))
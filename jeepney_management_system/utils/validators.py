@@ -1,11 +1,13 @@
+from utils.config_registry import get_registry
+
+
 class InputValidator:
     """Input validation utilities"""
     
     @staticmethod
     def validate_passenger_type(passenger_type: str) -> bool:
         """Validate passenger type"""
-        valid_types = ["regular", "student", "senior", "pwd"]
-        return passenger_type.lower() in valid_types
+        return passenger_type.lower() in get_registry().current().passenger_type_set
     
     @staticmethod
     def validate_amount(amount: str) -> tuple:
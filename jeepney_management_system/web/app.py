@@ -1,5 +1,17 @@
+from config import Config
+
+
 def create_web_app():
     """Create web application"""
-    print("🌐 Web interface not implemented yet!")
-    print("Coming soon in Phase 2...")
-    return None
\ No newline at end of file
+    try:
+        from flask import Flask
+    except ImportError:
+        print("🌐 Web interface needs Flask (pip install flask)")
+        return None
+
+    from web.routes import register_routes
+
+    app = Flask(__name__)
+    app.config["SECRET_KEY"] = Config.SECRET_KEY
+    register_routes(app)
+    return app
@@ -0,0 +1,11 @@
+from utils import metrics
+
+
+def register_routes(app):
+    """Attach all web routes to the Flask app"""
+
+    @app.route("/metrics")
+    def metrics_text():
+        """Plain-text metrics for scraping, summed over every exporting process"""
+        registry = metrics.fleet_registry(metrics.read_snapshots())
+        return registry.render_text(), 200, {"Content-Type": "text/plain; version=0.0.4"}